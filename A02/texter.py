@@ -6,36 +6,187 @@ Author: Valerie Bizova
 Description:
     Reads a text file and reports:
         a) total number of lines
-        b) number of lines containing the word 'sed' (case-insensitive)
+        b) number of lines containing each search term (case-insensitive),
+           by default the word 'sed'
+    The file is read once in large binary blocks, so memory use does not
+    grow with the file size; all terms are counted in one regex pass per block.
+    Several files, globs or directories (also .gz/.bz2 files) are processed
+    in a pool of worker processes, with per-file and total counts.
 Usage:
-    python texter.py <filename>
+    python texter.py <filename> [-t TERM ...]
+    python texter.py <file|glob|directory> ... [-t TERM ...] [-j N] [--json]
 """
 
+import os
+import re
+import bz2
 import sys
+import glob
+import gzip
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+
+BLOCK_SIZE = 8 * 1024 * 1024  # bytes read per block
+
+
+def char_pattern(char):
+    """
+    Return a bytes regex source matching char in ASCII-lowercased text.
+
+    Blocks are lowercased with bytes.lower(), which folds ASCII only, so
+    non-ASCII letters are matched in both their lower and upper case form.
+    """
+    lower, upper = char.lower(), char.upper()
+    if char.isascii() or lower == upper:
+        return re.escape(lower.encode('utf-8'))
+    return (b'(?:' + re.escape(lower.encode('utf-8')) + b'|'
+            + re.escape(upper.encode('utf-8')) + b')')
+
+
+def terms_pattern(terms):
+    """
+    Return one bytes regex source matching any of terms.
+
+    The alternation is a prefix trie ("sed", "set" -> se(?:d|t)), so the
+    regex engine tries one branch per position instead of every term, and
+    at a given position it matches the longest term.
+    """
+    tree = {}
+    for term in terms:
+        node = tree
+        for char in term:
+            node = node.setdefault(char_pattern(char), {})
+        node[None] = {}  # a term ends here
+
+    def emit(node):
+        branches = [piece + emit(child) for piece, child in sorted(node.items(), key=str)
+                    if piece is not None]
+        if not branches:
+            return b''
+        source = b'(?:' + b'|'.join(branches) + b')'
+        return source + b'?' if None in node else source
+
+    return emit(tree)
 
 
 class Texter:
     """Class for processing text files."""
 
-    def __init__(self, filename=None):
-        """Initialize with the given filename."""
+    def __init__(self, filename=None, terms=('sed',), block_size=BLOCK_SIZE):
+        """Initialize with the given filename and search terms."""
         self.filename = filename
+        self.terms = list(dict.fromkeys(t for t in terms if t))  # unique, in order
+        self.block_size = block_size
+
+        # One pass per block for all terms: line_re matches any term plus
+        # the rest of its line, so each match is one line with at least one
+        # hit (the empty group keeps findall() from copying the text), and
+        # hit_re then lists the terms starting at every position of such a
+        # line (a lookahead, so overlapping terms are all found).
+        source = terms_pattern(self.terms)
+        self.hit_re = re.compile(b'(?=(' + source + b'))')
+        self.line_re = re.compile(b'(?:' + source + b')[^\n]*()')
+        self.hit_terms = {}  # matched bytes -> indexes of the terms they contain
+
+    def credited(self, hit):
+        """Return the indexes of the terms a match of hit_re counts for."""
+        terms = self.hit_terms.get(hit)
+        if terms is None:
+            # The match is the longest term at its position; shorter terms
+            # that start there are its prefixes
+            text = hit.decode('utf-8', 'replace').lower()
+            terms = [i for i, t in enumerate(self.terms) if text.startswith(t.lower())]
+            self.hit_terms[hit] = terms
+        return terms
+
+    def scan_lines(self, buf, counts):
+        """Add the number of lines of buf containing each term to counts."""
+        # One lowercase copy per block instead of one per line
+        low = buf.lower()
+        if len(self.terms) == 1:
+            counts[0] += len(self.line_re.findall(low))
+            return
+
+        # The set of different hits on each line with a hit; there are
+        # few distinct sets, so the terms are credited once per set
+        findall = self.hit_re.findall
+        line_hits = Counter(frozenset(findall(low, *m.span()))
+                            for m in self.line_re.finditer(low))
+        for hits, lines in line_hits.items():
+            for i in set().union(*map(self.credited, hits)):
+                counts[i] += lines
+
+    def count_stream(self, stream):
+        """Return (total_lines, {term: lines_containing_term}) for a binary stream."""
+        counts = [0] * len(self.terms)
+        total_lines = 0
+        carry = []  # pieces of the unfinished last line, joined once it ends
+        self.bytes_scanned = 0
+
+        while True:
+            block = stream.read(self.block_size)
+            if not block:
+                break
+            self.bytes_scanned += len(block)
+            cut = block.rfind(b'\n')
+            if cut < 0:
+                carry.append(block)  # no line ends in this block yet
+                continue
+            # Lines crossing the block boundary are completed by the carry
+            if carry:
+                carry.append(block[:cut + 1])
+                buf = b''.join(carry)
+            else:
+                buf = block[:cut + 1]
+            carry = [block[cut + 1:]] if cut + 1 < len(block) else []
+            total_lines += buf.count(b'\n')
+            self.scan_lines(buf, counts)
+
+        if carry:  # last line without a trailing newline
+            total_lines += 1
+            self.scan_lines(b''.join(carry), counts)
+
+        return total_lines, dict(zip(self.terms, counts))
+
+    def count(self):
+        """Return (total_lines, {term: lines_containing_term}) for self.filename."""
+        with open_input(self.filename) as file:
+            return self.count_stream(file)
+
+    def count_file(self):
+        """Count self.filename and return a report dict including throughput."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        total_lines, term_lines = self.count()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        return {
+            "file": self.filename,
+            "lines": total_lines,
+            "terms": term_lines,
+            "bytes": self.bytes_scanned,
+            "seconds": wall,
+            "cpu_seconds": cpu,
+            "mb_per_s": self.bytes_scanned / 1e6 / wall if wall > 0 else 0.0,
+            "worker": os.getpid(),
+        }
 
     def run(self):
         """Analyze the text file and print the required results."""
         if not self.filename:
-            print("Usage: python texter.py <filename>")
+            print("Usage: python texter.py <filename> [-t TERM ...]")
             return
 
         try:
-            with open(self.filename, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-
-            total_lines = len(lines)
-            sed_lines = sum(1 for line in lines if 'sed' in line.lower())
+            total_lines, term_lines = self.count()
 
             print(f"Total number of lines: {total_lines}")
-            print(f"Number of lines containing 'sed': {sed_lines}")
+            for term, lines in term_lines.items():
+                print(f"Number of lines containing '{term}': {lines}")
 
         except FileNotFoundError:
             print(f"Error: The file '{self.filename}' was not found.")
@@ -43,10 +194,130 @@ class Texter:
             print(f"An unexpected error occurred: {err}")
 
 
+def open_input(path):
+    """Open a file for binary reading, decompressing .gz and .bz2 transparently."""
+    lower = path.lower()
+    if lower.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if lower.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def expand_inputs(inputs):
+    """Expand globs and directories (recursively) into a sorted list of files."""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.extend(os.path.join(root, n) for n in sorted(names))
+        elif glob.has_magic(item):
+            files.extend(sorted(p for p in glob.glob(item, recursive=True) if os.path.isfile(p)))
+        else:
+            files.append(item)
+    return list(dict.fromkeys(files))
+
+
+def count_one(args):
+    """Worker entry point: count one file, reporting errors instead of raising."""
+    filename, terms, block_size = args
+    try:
+        return Texter(filename, terms, block_size).count_file()
+    except Exception as err:
+        return {"file": filename, "error": str(err), "worker": os.getpid()}
+
+
+def run_many(inputs, terms=('sed',), jobs=None, as_json=False, block_size=BLOCK_SIZE):
+    """Count many files in a worker pool and print per-file, total and per-worker results."""
+    files = expand_inputs(inputs)
+    if not files:
+        print("No input files found.")
+        return None
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(files)))
+    terms = list(dict.fromkeys(t for t in terms if t))
+    tasks = [(f, terms, block_size) for f in files]
+
+    start = time.perf_counter()
+    if jobs == 1:
+        results = [count_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(count_one, tasks))
+    wall = time.perf_counter() - start
+
+    ok = [r for r in results if "error" not in r]
+    totals = {
+        "files": len(ok),
+        "errors": len(results) - len(ok),
+        "lines": sum(r["lines"] for r in ok),
+        "terms": {t: sum(r["terms"][t] for r in ok) for t in terms},
+        "bytes": sum(r["bytes"] for r in ok),
+        "seconds": wall,
+        "mb_per_s": sum(r["bytes"] for r in ok) / 1e6 / wall if wall > 0 else 0.0,
+    }
+
+    # Busy time per worker; CPU time close to wall time means CPU-bound
+    workers = {}
+    for r in ok:
+        w = workers.setdefault(r["worker"], {"files": 0, "bytes": 0, "seconds": 0.0, "cpu_seconds": 0.0})
+        w["files"] += 1
+        w["bytes"] += r["bytes"]
+        w["seconds"] += r["seconds"]
+        w["cpu_seconds"] += r["cpu_seconds"]
+    for w in workers.values():
+        w["mb_per_s"] = w["bytes"] / 1e6 / w["seconds"] if w["seconds"] > 0 else 0.0
+        w["cpu_share"] = w["cpu_seconds"] / w["seconds"] if w["seconds"] > 0 else 0.0
+
+    report = {"files": results, "total": totals, "workers": list(workers.values()), "jobs": jobs}
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    for r in results:
+        if "error" in r:
+            print(f"{r['file']}: error: {r['error']}")
+            continue
+        counts = ", ".join(f"'{t}': {n}" for t, n in r["terms"].items())
+        print(f"{r['file']}: {r['lines']} lines, {counts} ({r['mb_per_s']:.1f} MB/s)")
+
+    print(f"Total number of lines: {totals['lines']}")
+    for term, lines in totals["terms"].items():
+        print(f"Number of lines containing '{term}': {lines}")
+    print(f"Processed {totals['files']} files ({totals['bytes'] / 1e6:.1f} MB) "
+          f"in {wall:.2f} s with {jobs} workers ({totals['mb_per_s']:.1f} MB/s)")
+    for i, w in enumerate(workers.values(), start=1):
+        bound = "CPU-bound" if w["cpu_share"] > 0.8 else "I/O-bound"
+        print(f"  worker {i}: {w['files']} files, {w['mb_per_s']:.1f} MB/s, "
+              f"CPU {w['cpu_share']:.0%} of busy time ({bound})")
+    return report
+
+
+def parse_args(argv):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Count lines and lines containing search terms (case-insensitive).")
+    parser.add_argument("inputs", nargs="+", metavar="path",
+                        help="files, globs or directories (.gz/.bz2 are decompressed)")
+    parser.add_argument("-t", "--term", action="append", dest="terms",
+                        help="search term; repeat for several terms (default: sed)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="worker processes (default: number of cores)")
+    parser.add_argument("--json", action="store_true", help="print a machine-readable JSON report")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python texter.py <filename>")
+        print("Usage: python texter.py <filename> [-t TERM ...]")
     else:
-        filename = sys.argv[1]
-        texter = Texter(filename)
-        texter.run()
+        args = parse_args(sys.argv[1:])
+        terms = args.terms or ['sed']
+        path = args.inputs[0]
+        single = (len(args.inputs) == 1 and not args.json
+                  and not os.path.isdir(path) and not glob.has_magic(path))
+        if single:
+            texter = Texter(args.inputs[0], terms)
+            texter.run()
+        else:
+            run_many(args.inputs, terms, args.jobs, args.json)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Benchmark: streaming HTMLParser extractor vs. BeautifulSoup tree
+#
+# nist_benzidine.html is replicated COPIES times into one large file; each
+# engine then runs in a fresh subprocess and wall time and peak RSS are
+# reported. Both engines must return the same names.
+#
+# Usage: python bench_parser.py [--copies 10 100 300] [--repeat 3]
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ENGINES = ("bs4", "stream")
+
+def make_replicated(copies, out_path):
+    with open(os.path.join(HERE, "nist_benzidine.html"), "r", encoding="utf-8") as f:
+        page = f.read()
+    with open(out_path, "w", encoding="utf-8") as out:
+        for _ in range(copies):
+            out.write(page)
+
+def measure(engine, filename):
+    # Runs inside the child process
+    from nist_parser import iter_names, iter_names_bs4
+    start = time.perf_counter()
+    names = list(iter_names_bs4(filename) if engine == "bs4" else iter_names(filename))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024  # bytes on macOS, kilobytes on Linux
+    print(json.dumps({"seconds": seconds, "peak_rss_kb": peak,
+                      "names": len(names), "checksum": hash(tuple(names))}))
+
+def run_one(engine, filename):
+    out = subprocess.run([sys.executable, __file__, "--measure", engine, filename],
+                         check=True, capture_output=True, text=True, cwd=HERE,
+                         env=dict(os.environ, PYTHONHASHSEED="0"))
+    return json.loads(out.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NIST link extractors.")
+    parser.add_argument("--copies", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    print(f"{'copies':>7} {'size MB':>8} {'engine':>7} {'names':>7} {'time s':>8} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for copies in args.copies:
+            path = os.path.join(tmp, f"nist_{copies}.html")
+            make_replicated(copies, path)
+            size_mb = os.path.getsize(path) / 1e6
+
+            checksums = set()
+            for engine in ENGINES:
+                runs = [run_one(engine, path) for _ in range(args.repeat)]
+                checksums.add(runs[0]["checksum"])
+                best = min(r["seconds"] for r in runs)
+                peak = max(r["peak_rss_kb"] for r in runs) / 1024
+                print(f"{copies:>7} {size_mb:>8.1f} {engine:>7} {runs[0]['names']:>7} "
+                      f"{best:>8.3f} {peak:>12.1f}")
+            if len(checksums) != 1:
+                print("WARNING: the engines returned different names")
+
+if __name__ == "__main__":
+    main()
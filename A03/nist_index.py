@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# Batch indexer for saved NIST WebBook pages
+#
+# Parses every .html/.htm file of a directory in a process pool, normalizes
+# and deduplicates the compound names and NIST IDs / CAS numbers found in the
+# cbook.cgi links, and keeps them in a SQLite index with full-text search
+# mapping every name to the pages it was found on. Re-runs only parse pages
+# whose mtime/size changed and whose content hash differs from the indexed one.
+#
+# Usage: python nist_index.py build <directory> [--db nist_index.sqlite] [-j N]
+#        python nist_index.py search <query> [--db nist_index.sqlite]
+#        python nist_index.py list [--db nist_index.sqlite]
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import unicodedata
+from urllib.parse import urlparse, parse_qs
+from nist_parser import iter_links
+
+DB_PATH = "nist_index.sqlite"
+EXTENSIONS = (".html", ".htm")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY, mtime REAL, size INTEGER, sha256 TEXT);
+CREATE TABLE IF NOT EXISTS compounds (
+    nist_id TEXT PRIMARY KEY, cas TEXT);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS links (
+    page TEXT NOT NULL, name_id INTEGER NOT NULL, nist_id TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (page, name_id, nist_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS links_name ON links (name_id);
+"""
+
+# ---------- normalization ----------
+def normalize_name(text):
+    # Unicode NFKC (e.g. non-breaking spaces, ligatures) and single spaces
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def name_key(name):
+    # Deduplication key: case-insensitive
+    return name.casefold()
+
+def nist_id(href):
+    # "…/cgi/cbook.cgi?ID=C92875&Units=SI" -> "C92875"
+    values = parse_qs(urlparse(href or "").query).get("ID")
+    return values[0].strip().upper() if values else ""
+
+def cas_number(nist_id):
+    # C-IDs carry the CAS registry number without dashes: C92875 -> 92-87-5
+    digits = nist_id[1:]
+    if not nist_id.startswith("C") or not digits.isdigit() or len(digits) < 5:
+        return None
+    body, check = digits[:-1], int(digits[-1])
+    if sum(i * int(d) for i, d in enumerate(reversed(body), start=1)) % 10 != check:
+        return None
+    return f"{int(body[:-2])}-{body[-2:]}-{check}"
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# ---------- worker ----------
+def parse_page(task):
+    # Runs in a worker process; returns (path, sha256, links or None if unchanged, error)
+    path, old_hash = task
+    try:
+        sha = file_hash(path)
+        if sha == old_hash:
+            return path, sha, None, None
+        links = {}
+        for text, href in iter_links(path):
+            name = normalize_name(text)
+            if name:
+                links.setdefault((name_key(name), nist_id(href)), name)
+        return path, sha, [(name, key, nid) for (key, nid), name in links.items()], None
+    except (OSError, UnicodeDecodeError) as err:
+        return path, None, None, str(err)
+    except Exception as err:  # a page the parser cannot handle is skipped, too
+        return path, None, None, f"{type(err).__name__}: {err}"
+
+def find_pages(directory):
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(EXTENSIONS):
+                pages.append(os.path.abspath(os.path.join(root, name)))
+    return sorted(pages)
+
+# ---------- index ----------
+class NistIndex:
+    def __init__(self, db_path=DB_PATH):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5(name);")
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5
+            self.fts = False
+
+    def close(self):
+        self.conn.close()
+
+    def name_id(self, name, key):
+        row = self.conn.execute("SELECT id FROM names WHERE key = ?;", (key,)).fetchone()
+        if row:
+            return row[0]
+        cur = self.conn.execute("INSERT INTO names (name, key) VALUES (?, ?);", (name, key))
+        if self.fts:
+            self.conn.execute("INSERT INTO names_fts (rowid, name) VALUES (?, ?);",
+                              (cur.lastrowid, name))
+        return cur.lastrowid
+
+    def store_page(self, path, mtime, size, sha, links):
+        self.conn.execute("DELETE FROM links WHERE page = ?;", (path,))
+        for name, key, nid in links:
+            if nid:
+                self.conn.execute("INSERT OR IGNORE INTO compounds VALUES (?, ?);",
+                                  (nid, cas_number(nid)))
+            self.conn.execute("INSERT OR IGNORE INTO links VALUES (?, ?, ?);",
+                              (path, self.name_id(name, key), nid))
+        self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?);",
+                          (path, mtime, size, sha))
+
+    def remove_page(self, path):
+        self.conn.execute("DELETE FROM links WHERE page = ?;", (path,))
+        self.conn.execute("DELETE FROM pages WHERE path = ?;", (path,))
+
+    def prune(self):
+        # Names and compounds no longer linked from any page
+        orphans = [r[0] for r in self.conn.execute(
+            "SELECT id FROM names WHERE id NOT IN (SELECT name_id FROM links);")]
+        for nid in orphans:
+            self.conn.execute("DELETE FROM names WHERE id = ?;", (nid,))
+            if self.fts:
+                self.conn.execute("DELETE FROM names_fts WHERE rowid = ?;", (nid,))
+        self.conn.execute("DELETE FROM compounds WHERE nist_id NOT IN (SELECT nist_id FROM links);")
+
+    def build(self, directory, jobs=None):
+        start = time.perf_counter()
+        pages = find_pages(directory)
+        known = {r[0]: r[1:] for r in self.conn.execute("SELECT path, mtime, size, sha256 FROM pages;")}
+
+        # mtime and size unchanged -> skip without reading the file
+        tasks, stats = [], {}
+        for path in pages:
+            st = os.stat(path)
+            stats[path] = (st.st_mtime, st.st_size)
+            old = known.get(path)
+            if old and (old[0], old[1]) == stats[path]:
+                continue
+            tasks.append((path, old[2] if old else None))
+
+        root = os.path.join(os.path.abspath(directory), "")
+        removed = [p for p in known if p.startswith(root) and p not in stats]
+
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(tasks) or 1))
+        pool = None
+        if jobs == 1:
+            results = map(parse_page, tasks)
+        else:
+            from concurrent.futures import ProcessPoolExecutor  # ~30 ms; only needed here
+            pool = ProcessPoolExecutor(max_workers=jobs)
+            results = pool.map(parse_page, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+
+        parsed = touched = failed = 0
+        try:
+            with self.conn:
+                for path, sha, links, error in results:
+                    if error:
+                        print(f"Skipping {path}: {error}")
+                        failed += 1
+                        continue
+                    mtime, size = stats[path]
+                    if links is None:  # touched but same content
+                        self.conn.execute("UPDATE pages SET mtime = ?, size = ? WHERE path = ?;",
+                                          (mtime, size, path))
+                        touched += 1
+                    else:
+                        self.store_page(path, mtime, size, sha, links)
+                        parsed += 1
+                for path in removed:
+                    self.remove_page(path)
+                self.prune()
+        finally:
+            # Also when storing fails (or on Ctrl+C), so no worker processes are left behind
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        names, compounds = self.counts()
+        print(f"{len(pages)} pages: {parsed} parsed, {touched} unchanged content, "
+              f"{len(pages) - len(tasks)} skipped, {len(removed)} removed, {failed} failed "
+              f"({time.perf_counter() - start:.2f} s, {jobs} workers)")
+        print(f"Index: {names} unique names, {compounds} compounds")
+
+    def counts(self):
+        names = self.conn.execute("SELECT COUNT(*) FROM names;").fetchone()[0]
+        compounds = self.conn.execute("SELECT COUNT(*) FROM compounds;").fetchone()[0]
+        return names, compounds
+
+    def search(self, query, limit=50):
+        # Returns [(name, [(nist_id, cas)], [pages])] for names matching query
+        if self.fts:
+            sql = ("SELECT n.id, n.name FROM names_fts f JOIN names n ON n.id = f.rowid "
+                   "WHERE names_fts MATCH ? ORDER BY rank LIMIT ?;")
+            words = normalize_name(query).replace('"', " ").split()
+            params = (" ".join(f'"{w}"*' for w in words), limit)
+        else:
+            sql = "SELECT id, name FROM names WHERE key LIKE ? ORDER BY name LIMIT ?;"
+            params = (f"%{name_key(normalize_name(query))}%", limit)
+        return [self.describe(nid, name) for nid, name in self.conn.execute(sql, params).fetchall()]
+
+    def all_names(self):
+        rows = self.conn.execute("SELECT id, name FROM names ORDER BY key;").fetchall()
+        return [self.describe(nid, name) for nid, name in rows]
+
+    def describe(self, name_id, name):
+        ids = self.conn.execute(
+            "SELECT DISTINCT l.nist_id, c.cas FROM links l LEFT JOIN compounds c "
+            "ON c.nist_id = l.nist_id WHERE l.name_id = ? AND l.nist_id != '' ORDER BY 1;",
+            (name_id,)).fetchall()
+        pages = [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT page FROM links WHERE name_id = ? ORDER BY page;", (name_id,))]
+        return name, ids, pages
+
+def print_entries(entries, show_pages=True):
+    for name, ids, pages in entries:
+        refs = ", ".join(f"{i} (CAS {cas})" if cas else i for i, cas in ids)
+        print(f"{name}  [{refs}]" if refs else name)
+        if show_pages:
+            for page in pages:
+                print(f"    {page}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Index compound names from saved NIST WebBook pages.")
+    parser.add_argument("--db", default=DB_PATH, help=f"index database (default: {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="(re)index a directory of saved pages")
+    build.add_argument("directory")
+    build.add_argument("-j", "--jobs", type=int, help="worker processes (default: number of cores)")
+
+    search = sub.add_parser("search", help="full-text search of compound names")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=50)
+
+    sub.add_parser("list", help="print every unique name with its IDs")
+    args = parser.parse_args()
+
+    if args.command == "build" and not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}")
+        sys.exit(1)
+
+    index = NistIndex(args.db)
+    try:
+        if args.command == "build":
+            index.build(args.directory, args.jobs)
+        elif args.command == "search":
+            entries = index.search(args.query, args.limit)
+            if not entries:
+                print("No matches.")
+            print_entries(entries)
+        else:
+            print_entries(index.all_names(), show_pages=False)
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,98 @@
 #!/usr/bin/env python3
 import sys
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+
+CBOOK = "/cgi/cbook.cgi"
+CHUNK_SIZE = 1 << 16
+
+class CbookLinkParser(HTMLParser):
+    # Streaming parser: collects the text and href of <a> tags linking to
+    # cbook.cgi without building a document tree
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []      # finished (text, href) pairs, drained by the caller
+        self.depth = 0       # > 0 while inside a matching <a>
+        self.parts = []
+        self.href = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            if tag == "a":
+                self.depth += 1
+            return
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href is not None and CBOOK in href:
+                self.depth = 1
+                self.parts = []
+                self.href = href
+
+    def handle_endtag(self, tag):
+        if self.depth and tag == "a":
+            self.depth -= 1
+            if not self.depth:
+                self.links.append(("".join(self.parts), self.href))
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+def iter_links(filename):
+    # Feed the file in chunks and yield (text, href) as soon as a link is complete
+    parser = CbookLinkParser()
+    with open(filename, "r", encoding="utf-8") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ""):
+            parser.feed(chunk)
+            yield from drain(parser)
+    parser.close()
+    if parser.depth:  # unclosed <a> at the end of the file
+        parser.links.append(("".join(parser.parts), parser.href))
+    yield from drain(parser)
+
+def drain(parser):
+    links, parser.links = parser.links, []
+    for name, href in links:
+        text = name.strip()
+        if text:
+            yield text, href
+
+def iter_names(filename):
+    for text, _ in iter_links(filename):
+        yield text
+
+def iter_names_bs4(filename):
+    # Fallback: full BeautifulSoup tree (slower, more memory)
+    from bs4 import BeautifulSoup
 
-def parse_file(filename):
     # Open and parse the HTML file
     with open(filename, "r", encoding="utf-8") as f:
         soup = BeautifulSoup(f, "html.parser")
 
     # Find all <a> tags with href containing '/cgi/cbook.cgi'
     for a in soup.find_all("a", href=True):
-        if "/cgi/cbook.cgi" in a["href"]:
+        if CBOOK in a["href"]:
             text = a.get_text().strip()
             if text:
-                print(text)
+                yield text
+
+def parse_file(filename, engine="stream"):
+    names = iter_names_bs4(filename) if engine == "bs4" else iter_names(filename)
+    for text in names:
+        print(text)
 
 def main():
-    if len(sys.argv) < 2:
-        print(f"Usage: python {sys.argv[0]} <html_filename>")
+    args = sys.argv[1:]
+    engine = "stream"
+    if "--bs4" in args:
+        args.remove("--bs4")
+        engine = "bs4"
+
+    if len(args) < 1:
+        print(f"Usage: python {sys.argv[0]} [--bs4] <html_filename>")
         sys.exit(1)
 
-    filename = sys.argv[1]
-    parse_file(filename)
+    filename = args[0]
+    parse_file(filename, engine)
 
 if __name__ == "__main__":
     main()
-
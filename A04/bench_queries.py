@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark the WorldDB question queries with and without indexes.
+
+Builds scaled-up synthetic copies of country.csv, city.csv and
+countrylanguage.csv (every country is copied SCALE times under a new code,
+together with its cities and languages), imports them into a temporary
+database and times each query before and after create_indexes().
+
+Usage:
+    python bench_queries.py [--scale 50] [--repeat 5]
+"""
+import os
+import csv
+import time
+import argparse
+import tempfile
+from db import WorldDB
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+QUERIES = {
+    "population of region": (
+        "SELECT SUM(Population) FROM country WHERE Region = ?;",
+        ("Southern Europe",),
+    ),
+    "city population of region": (
+        "SELECT SUM(ci.Population) FROM city ci "
+        "JOIN country co ON ci.CountryCode = co.Code WHERE co.Region = ?;",
+        ("Southern Europe",),
+    ),
+    "official languages of region": (
+        "SELECT COUNT(DISTINCT cl.Language) FROM countrylanguage cl "
+        "JOIN country co ON cl.CountryCode = co.Code "
+        "WHERE co.Region = ? AND cl.IsOfficial = 'T';",
+        ("Southern Europe",),
+    ),
+    "cities of one country": (
+        "SELECT COUNT(*) FROM city WHERE CountryCode = ?;",
+        ("CZE",),
+    ),
+}
+
+def read_rows(name):
+    with open(os.path.join(HERE, name), "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = next(reader)
+        return header, list(reader)
+
+def write_scaled(out_dir, scale):
+    """Write scaled copies of the three world tables into out_dir and return their paths."""
+    paths = []
+    for name in ("country.csv", "city.csv", "countrylanguage.csv"):
+        header, rows = read_rows(name)
+        code_col = header.index("Code") if "Code" in header else header.index("CountryCode")
+        id_col = header.index("ID") if "ID" in header else None
+        path = os.path.join(out_dir, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(header)
+            for k in range(scale):
+                for row in rows:
+                    row = list(row)
+                    if k:
+                        row[code_col] = f"{row[code_col]}{k}"
+                        if id_col is not None:
+                            row[id_col] = str(int(row[id_col]) + k * 100000)
+                    writer.writerow(row)
+        paths.append(path)
+    return paths
+
+def time_query(db, sql, params, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.conn.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WorldDB queries with and without indexes.")
+    parser.add_argument("--scale", type=int, default=50, help="copies of every country (default: 50)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query; the fastest is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_paths = write_scaled(tmp, args.scale)
+        db = WorldDB(["bench"] + csv_paths, db_path=os.path.join(tmp, "bench.sqlite"))
+        db.import_from_args()
+
+        db.drop_indexes()
+        plain = {name: time_query(db, sql, params, args.repeat)
+                 for name, (sql, params) in QUERIES.items()}
+        db.create_indexes()
+        indexed = {name: time_query(db, sql, params, args.repeat)
+                   for name, (sql, params) in QUERIES.items()}
+
+        print()
+        print(f"{'query':<32} {'no index ms':>12} {'indexed ms':>12} {'speedup':>8}")
+        for name in QUERIES:
+            speedup = plain[name] / indexed[name] if indexed[name] else float("inf")
+            print(f"{name:<32} {plain[name] * 1000:>12.2f} {indexed[name] * 1000:>12.2f} {speedup:>7.1f}x")
+
+        print()
+        for name, (sql, params) in QUERIES.items():
+            print(f"{name}:")
+            print("  " + db.explain(sql, params).replace("\n", "\n  "))
+        db.conn.close()
+
+if __name__ == "__main__":
+    main()
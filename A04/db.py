@@ -3,16 +3,26 @@ import sys
 import os
 import csv
 import sqlite3
+import time
+import multiprocessing
+from queue import Empty
 from pathlib import Path
 
 class WorldDB:
-    def __init__(self, argv):
+    def __init__(self, argv, db_path="db.sqlite"):
         # Allowed only one "global": the class instance
         self.args = argv[1:]
-        self.db_path = "db.sqlite"
+        self.db_path = db_path
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
         self.conn.execute("PRAGMA foreign_keys = ON;")
+        # Callbacks called with a table name after an import changed that table
+        # (used by world_service.py to invalidate cached results)
+        self.listeners = []
+
+    def table_changed(self, table):
+        for listener in list(self.listeners):
+            listener(table)
 
     # ---------- utilities ----------
     def table_exists(self, table_name):
@@ -26,37 +36,329 @@ class WorldDB:
         return '"' + name.replace('"', '""') + '"'
 
     # ---------- CSV import ----------
+    CHUNK_SIZE = 10000   # rows per executemany() call
+    SAMPLE_ROWS = 1000   # rows used to infer column types
+    NULL_VALUES = ("", "NULL")
+
+    # PRAGMAs used only while bulk loading; the previous values are restored afterwards
+    BULK_PRAGMAS = {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": "-200000",  # negative = KiB, i.e. ~200 MB
+    }
+
+    @staticmethod
+    def open_csv(csv_path):
+        f = open(csv_path, "r", encoding="utf-8-sig", newline="")
+        return f, csv.reader(f, delimiter=';')  # semicolon CSV files
+
+    @staticmethod
+    def value_type(value):
+        """Return INTEGER, REAL or TEXT for a single CSV value."""
+        # Keep codes such as "007" as text so leading zeros survive
+        if len(value) > 1 and value[0] == "0" and value[1] != ".":
+            return "TEXT"
+        try:
+            int(value)
+            return "INTEGER"
+        except ValueError:
+            pass
+        try:
+            float(value)
+            return "REAL"
+        except ValueError:
+            return "TEXT"
+
+    def infer_types(self, csv_path, ncols):
+        """Sample the first rows of a CSV file and infer a SQLite type per column."""
+        rank = {"INTEGER": 0, "REAL": 1, "TEXT": 2}
+        types = [None] * ncols
+
+        f, reader = self.open_csv(csv_path)
+        with f:
+            next(reader, None)  # header
+            for _, row in zip(range(self.SAMPLE_ROWS), reader):
+                for i, value in enumerate(row[:ncols]):
+                    if value in self.NULL_VALUES:
+                        continue
+                    t = self.value_type(value)
+                    if types[i] is None or rank[t] > rank[types[i]]:
+                        types[i] = t
+
+        return [t or "TEXT" for t in types]
+
+    @classmethod
+    def converter(cls, col_type):
+        """Return a function that converts a CSV string to a value for col_type."""
+        null_values = cls.NULL_VALUES
+
+        def convert(value):
+            if value in null_values:
+                return None
+            try:
+                if col_type == "INTEGER":
+                    return int(value)
+                if col_type == "REAL":
+                    return float(value)
+            except ValueError:
+                pass  # rows after the sample may not fit; keep the text
+            return value
+
+        return convert
+
+    def set_pragmas(self, pragmas):
+        """Apply PRAGMAs and return their previous values."""
+        previous = {}
+        for name, value in pragmas.items():
+            current = self.conn.execute(f"PRAGMA {name};").fetchone()[0]
+            # Leaving WAL needs exclusive access (readers may be connected);
+            # WAL is fast enough for bulk loads anyway.
+            if name == "journal_mode" and str(current).lower() == "wal":
+                continue
+            previous[name] = current
+            self.conn.execute(f"PRAGMA {name} = {value};")
+        return previous
+
+    def create_table(self, table, csv_path, headers):
+        """Create a table with column types inferred from a sample; return (insert_sql, types)."""
+        types = self.infer_types(csv_path, len(headers))
+        cols_sql = ", ".join(f"{self.quoted(h)} {t}" for h, t in zip(headers, types))
+        self.conn.execute(f"CREATE TABLE {self.quoted(table)} ({cols_sql});")
+        self.conn.commit()
+
+        placeholders = ", ".join(["?"] * len(headers))
+        insert_sql = f"INSERT INTO {self.quoted(table)} VALUES ({placeholders});"
+        return insert_sql, types
+
     def import_csv(self, csv_path):
         table = Path(csv_path).stem  # filename without extension
         if self.table_exists(table):
             return  # do not recreate table if exists
 
-        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.reader(f, delimiter=';')  # <<< FIXED: semicolon CSV files
+        f, reader = self.open_csv(csv_path)
+        with f:
             try:
                 headers = next(reader)
             except StopIteration:
                 return
 
-            # Create table (all TEXT columns)
-            cols_sql = ", ".join(f"{self.quoted(h)} TEXT" for h in headers)
-            self.conn.execute(f"CREATE TABLE {self.quoted(table)} ({cols_sql});")
+            insert_sql, types = self.create_table(table, csv_path, headers)
+            converters = [self.converter(t) for t in types]
+
+            # Stream rows in fixed-size chunks inside one transaction
+            start = time.perf_counter()
+            total = 0
+            previous = self.set_pragmas(self.BULK_PRAGMAS)
+            try:
+                self.conn.execute("BEGIN;")
+                while True:
+                    chunk = [
+                        [conv(v) for conv, v in zip(converters, row)]
+                        for _, row in zip(range(self.CHUNK_SIZE), reader)
+                    ]
+                    if not chunk:
+                        break
+                    self.conn.executemany(insert_sql, chunk)
+                    total += len(chunk)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                self.set_pragmas(previous)
+
+            elapsed = time.perf_counter() - start
+            rate = total / elapsed if elapsed > 0 else 0
+            print(f"Imported {total} rows into '{table}' in {elapsed:.2f} s ({rate:,.0f} rows/s)")
+            self.table_changed(table)
+
+    # ---------- pipelined multi-file import ----------
+    QUEUE_SIZE = 16             # chunks waiting for the writer (bounds memory)
+    COMMIT_EVERY = 100000       # rows per writer transaction
+
+    def import_parallel(self, csv_paths, workers=None):
+        """
+        Import several CSV files at once.
+
+        One worker process per file parses and type-converts rows in chunks
+        and puts them on a bounded queue; this connection is the only
+        writer and drains the queue, committing in batches. Tables that
+        already exist are skipped, as in import_csv.
+        """
+        jobs = []
+        for csv_path in csv_paths:
+            table = Path(csv_path).stem
+            if self.table_exists(table):
+                continue
+            f, reader = self.open_csv(csv_path)
+            with f:
+                headers = next(reader, None)
+            if not headers:
+                continue
+            insert_sql, types = self.create_table(table, csv_path, headers)
+            jobs.append((table, csv_path, types, insert_sql))
+        if not jobs:
+            return
+
+        workers = min(len(jobs), workers or os.cpu_count() or 1)
+        queue = multiprocessing.Queue(maxsize=self.QUEUE_SIZE)
+        pending = list(jobs)
+        running = {}
+        insert_sqls = {table: sql for table, _, _, sql in jobs}
+        stats = {table: {"rows": 0, "parse": 0.0, "queue": 0.0, "write": 0.0} for table in insert_sqls}
+        failed = {}
+
+        def start_next():
+            table, csv_path, types, _ = pending.pop(0)
+            proc = multiprocessing.Process(
+                target=parse_worker, args=(table, csv_path, types, self.CHUNK_SIZE, queue))
+            proc.start()
+            running[table] = proc
 
-            # Prepare insert
-            placeholders = ", ".join(["?"] * len(headers))
-            insert_sql = f"INSERT INTO {self.quoted(table)} VALUES ({placeholders});"
+        start = time.perf_counter()
+        previous = self.set_pragmas(self.BULK_PRAGMAS)
+        try:
+            while pending and len(running) < workers:
+                start_next()
 
-            # Insert rows
-            rows = [row for row in reader]
-            self.conn.executemany(insert_sql, rows)
+            uncommitted = 0
+            self.conn.execute("BEGIN;")
+            while running:
+                try:
+                    messages = [queue.get(timeout=1)]
+                except Empty:
+                    # A worker that died without reporting would block us forever
+                    dead = [t for t, proc in running.items() if not proc.is_alive()]
+                    if not dead:
+                        continue
+                    # A worker may have finished normally just after the timeout:
+                    # its last messages are then already in the queue
+                    messages = drain(queue)
+                    reported = {t for kind, t, _ in messages if kind != "rows"}
+                    messages += [("error", t, "parser process exited unexpectedly")
+                                 for t in dead if t not in reported]
+
+                for kind, table, payload in messages:
+                    if kind == "rows":
+                        t0 = time.perf_counter()
+                        self.conn.executemany(insert_sqls[table], payload)
+                        stats[table]["write"] += time.perf_counter() - t0
+                        stats[table]["rows"] += len(payload)
+                        uncommitted += len(payload)
+                        if uncommitted >= self.COMMIT_EVERY:
+                            self.conn.commit()
+                            self.conn.execute("BEGIN;")
+                            uncommitted = 0
+                        continue
+
+                    # "done" or "error": the worker has finished
+                    proc = running.pop(table)
+                    proc.join()
+                    if kind == "done" and proc.exitcode:
+                        kind, payload = "error", f"parser process exited with code {proc.exitcode}"
+                    if kind == "error":
+                        failed[table] = payload
+                    else:
+                        stats[table]["parse"] = payload["parse"]
+                        stats[table]["queue"] = payload["queue"]
+                    if pending:
+                        start_next()
             self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            for proc in running.values():
+                proc.terminate()
+            raise
+        finally:
+            self.set_pragmas(previous)
+
+        # Do not leave half-imported tables behind
+        for table, message in failed.items():
+            print(f"Error importing '{table}': {message}")
+            self.conn.execute(f"DROP TABLE {self.quoted(table)};")
+            del stats[table]
+        self.conn.commit()
+
+        elapsed = time.perf_counter() - start
+        print(f"{'table':<20} {'rows':>10} {'parse s':>9} {'queue s':>9} {'write s':>9}")
+        for table, st in stats.items():
+            print(f"{table:<20} {st['rows']:>10} {st['parse']:>9.2f} {st['queue']:>9.2f} {st['write']:>9.2f}")
+        total = sum(st["rows"] for st in stats.values())
+        rate = total / elapsed if elapsed > 0 else 0
+        print(f"Imported {total} rows in {elapsed:.2f} s ({rate:,.0f} rows/s, {workers} parser processes)")
+        for table in insert_sqls:
+            self.table_changed(table)
 
     def import_from_args(self):
+        paths = []
         for p in self.args:
             if not os.path.isfile(p):
                 print(f"CSV file not found: {p}")
                 continue
-            self.import_csv(p)
+            paths.append(p)
+
+        if len(paths) > 1:
+            self.import_parallel(paths)
+        elif paths:
+            self.import_csv(paths[0])
+
+    # ---------- indexes and statistics ----------
+    # Columns the question queries filter on, per table
+    FILTER_COLUMNS = {
+        "country": ["Region"],
+    }
+
+    def is_key_column(self, name):
+        """Key-like columns used for joins: ID, Code, CountryCode, ..."""
+        lower = name.lower()
+        return lower == "id" or lower.endswith("code")
+
+    def index_columns(self, table):
+        cur = self.conn.execute(f'PRAGMA table_info({self.quoted(table)});')
+        columns = [row["name"] for row in cur.fetchall()]
+        wanted = {c.lower() for c in self.FILTER_COLUMNS.get(table, [])}
+        return [c for c in columns if self.is_key_column(c) or c.lower() in wanted]
+
+    def create_indexes(self):
+        """Index key-like and filtered columns of all tables, then run ANALYZE."""
+        cur = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
+        )
+        tables = [row["name"] for row in cur.fetchall()]
+
+        created = 0
+        for table in tables:
+            for column in self.index_columns(table):
+                index = f"idx_{table}_{column}"
+                if self.conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='index' AND name=?;", (index,)
+                ).fetchone():
+                    continue
+                self.conn.execute(
+                    f"CREATE INDEX {self.quoted(index)} ON {self.quoted(table)} ({self.quoted(column)});"
+                )
+                created += 1
+
+        # Refresh planner statistics only when something changed
+        if created:
+            self.conn.execute("ANALYZE;")
+        self.conn.commit()
+        return created
+
+    def drop_indexes(self):
+        """Drop the indexes made by create_indexes() (used by the benchmark)."""
+        cur = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx\\_%' ESCAPE '\\';"
+        )
+        for row in cur.fetchall():
+            self.conn.execute(f"DROP INDEX {self.quoted(row['name'])};")
+        self.conn.execute("ANALYZE;")
+        self.conn.commit()
+
+    def explain(self, sql, params=()):
+        """Return the query plan of sql as text (EXPLAIN QUERY PLAN)."""
+        cur = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return "\n".join(row["detail"] for row in cur.fetchall())
 
     # ---------- Answer Question #2 ----------
     def get_column(self, table, want):
@@ -66,6 +368,13 @@ class WorldDB:
                 return row["name"]
         return None
 
+    def get_column_type(self, table, column):
+        cur = self.conn.execute(f'PRAGMA table_info({self.quoted(table)});')
+        for row in cur.fetchall():
+            if row["name"] == column:
+                return row["type"].upper()
+        return None
+
     def answer_q2(self):
         """
         Q2: What is the total population of Southern Europe?
@@ -85,8 +394,13 @@ class WorldDB:
             print("Answer: (cannot compute – 'Region' or 'Population' column missing)")
             return
 
+        # Tables imported with typed columns need no per-row CAST
+        pop_expr = self.quoted(pop_col)
+        if self.get_column_type("country", pop_col) != "INTEGER":
+            pop_expr = f"CAST({pop_expr} AS INTEGER)"
+
         sql = f"""
-        SELECT SUM(CAST({self.quoted(pop_col)} AS INTEGER)) AS total
+        SELECT SUM({pop_expr}) AS total
         FROM {self.quoted("country")}
         WHERE {self.quoted(region_col)} = 'Southern Europe';
         """
@@ -102,10 +416,53 @@ class WorldDB:
     def run(self):
         if self.args:  # if CSVs were provided: import them
             self.import_from_args()
+        self.create_indexes()
         self.answer_q2()
         self.conn.close()
 
 
+def drain(queue):
+    """Return the messages already waiting in queue, without blocking."""
+    messages = []
+    while True:
+        try:
+            messages.append(queue.get_nowait())
+        except Empty:
+            return messages
+
+def parse_worker(table, csv_path, types, chunk_size, queue):
+    """
+    Worker process for WorldDB.import_parallel: parse and convert one CSV file.
+
+    Sends ("rows", table, chunk) messages and finally ("done", table, timings)
+    or ("error", table, message). Time blocked on the full queue is reported
+    separately from parsing time.
+    """
+    parse_time = 0.0
+    queue_time = 0.0
+    try:
+        converters = [WorldDB.converter(t) for t in types]
+        f, reader = WorldDB.open_csv(csv_path)
+        with f:
+            next(reader, None)  # header
+            while True:
+                t0 = time.perf_counter()
+                chunk = [
+                    [conv(v) for conv, v in zip(converters, row)]
+                    for _, row in zip(range(chunk_size), reader)
+                ]
+                t1 = time.perf_counter()
+                parse_time += t1 - t0
+                if not chunk:
+                    break
+                queue.put(("rows", table, chunk))
+                queue_time += time.perf_counter() - t1
+    except Exception as err:
+        queue.put(("error", table, str(err)))
+        return
+    queue.put(("done", table, {"parse": parse_time, "queue": queue_time}))
+
+
 def main():
     app = WorldDB(sys.argv)
     app.run()
@@ -0,0 +1,112 @@
+"""
+Tests for the result cache of world_service.py.
+
+Run from the repository root:
+    python -m pytest -q A04
+"""
+import os
+import sys
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from db import WorldDB
+from world_service import WorldService
+
+QUESTION = ("population_by_region", {"region": "Southern Europe"})
+
+
+@pytest.fixture
+def world(tmp_path):
+    db = WorldDB(["test"], db_path=str(tmp_path / "world.sqlite"))
+    db.import_csv(os.path.join(HERE, "country.csv"))
+    service = WorldService(db.db_path, pool_size=1)
+    service.watch_imports(db)
+    yield db, service
+    service.close()
+    db.conn.close()
+
+def during_query(service, action):
+    """Make the next query of service run action() after its rows are read."""
+    real = service.connection
+
+    class Conn:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def execute(self, *args):
+            rows = self.conn.execute(*args).fetchall()
+            action()
+            return rows_cursor(rows)
+
+    @contextmanager
+    def connection():
+        with real() as conn:
+            yield Conn(conn)
+        service.connection = real
+    service.connection = connection
+
+def rows_cursor(rows):
+    class Cursor:
+        def fetchall(self):
+            return rows
+    return Cursor()
+
+def total(service):
+    name, params = QUESTION
+    return service.ask(name, **params)[0]["total"]
+
+def set_population(db_path, value):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE country SET Population = ? WHERE Region = 'Southern Europe';", (value,))
+    conn.close()
+
+
+def test_result_is_cached(world):
+    _, service = world
+    first = total(service)
+    assert total(service) == first
+    assert (service.cache.hits, service.cache.misses) == (1, 1)
+
+def test_import_during_query_is_not_cached(world):
+    db, service = world
+    old = total(service)
+    service.cache.invalidate()
+
+    # An import commits new rows and notifies the listener while the query
+    # still holds rows from the old snapshot
+    def import_commits():
+        set_population(db.db_path, 1)
+        db.table_changed("country")
+    during_query(service, import_commits)
+    assert total(service) == old  # this answer is already stale ...
+    assert len(service.cache.entries) == 0  # ... so it is not cached
+    assert total(service) != old
+
+def test_external_commit_during_query_is_not_cached(world):
+    db, service = world
+    old = total(service)
+    service.cache.invalidate()
+
+    # Another process commits; another request thread notices it first
+    def other_thread_checks():
+        set_population(db.db_path, 1)
+        service.check_external_changes()
+    during_query(service, other_thread_checks)
+    assert total(service) == old
+    assert len(service.cache.entries) == 0
+    assert total(service) != old
+
+def test_put_with_old_generation_is_dropped(world):
+    _, service = world
+    cache = service.cache
+    generation = cache.generation
+    cache.invalidate("city")
+    cache.put(("q", ()), [{"total": 1}], ["country"], generation)
+    assert len(cache.entries) == 0
+    cache.put(("q", ()), [{"total": 1}], ["country"], cache.generation)
+    assert len(cache.entries) == 1
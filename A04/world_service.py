@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Long-running read-only query service for the world database.
+
+Keeps a pool of read-only SQLite connections (WAL mode, mode=ro URIs),
+answers parameterized versions of the WorldDB questions and caches results
+in an LRU cache. Cached results are dropped when a watched WorldDB imports
+a table in this process, and the whole cache is dropped when another
+process commits to the database file.
+
+Library use:
+    service = WorldService("db.sqlite")
+    service.ask("population_by_region", region="Southern Europe")
+    service.watch_imports(db)    # db: a WorldDB importing into the same file
+
+HTTP/JSON use:
+    python world_service.py [--db db.sqlite] [--port 8000] [--pool 4]
+    curl "http://127.0.0.1:8000/ask/population_by_region?region=Southern%20Europe"
+"""
+import sys
+import json
+import queue
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# name -> (description, SQL, parameter names, tables read)
+QUESTIONS = {
+    "population_by_region": (
+        "What is the total population of a region?",
+        "SELECT SUM(Population) AS total FROM country WHERE Region = ?;",
+        ["region"], ["country"],
+    ),
+    "population_by_continent": (
+        "What is the total population of a continent?",
+        "SELECT SUM(Population) AS total FROM country WHERE Continent = ?;",
+        ["continent"], ["country"],
+    ),
+    "population_per_region": (
+        "What is the total population of every region?",
+        "SELECT Region AS region, SUM(Population) AS total FROM country "
+        "GROUP BY Region ORDER BY total DESC;",
+        [], ["country"],
+    ),
+    "city_population_by_region": (
+        "How many people live in the listed cities of a region?",
+        "SELECT SUM(ci.Population) AS total FROM city ci "
+        "JOIN country co ON ci.CountryCode = co.Code WHERE co.Region = ?;",
+        ["region"], ["city", "country"],
+    ),
+    "official_languages_by_region": (
+        "Which official languages are spoken in a region?",
+        "SELECT DISTINCT cl.Language AS language FROM countrylanguage cl "
+        "JOIN country co ON cl.CountryCode = co.Code "
+        "WHERE co.Region = ? AND cl.IsOfficial = 'T' ORDER BY language;",
+        ["region"], ["countrylanguage", "country"],
+    ),
+    "largest_cities_of_country": (
+        "What are the largest cities of a country (by country code)?",
+        "SELECT Name AS name, Population AS population FROM city "
+        "WHERE CountryCode = ? ORDER BY Population DESC LIMIT 10;",
+        ["code"], ["city"],
+    ),
+}
+
+class QuestionError(Exception):
+    """Unknown question or missing parameter."""
+
+
+class ResultCache:
+    """Thread-safe LRU cache of query results with per-table invalidation."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (result, tables)
+        self.lock = threading.Lock()
+        # Bumped by every invalidate(); a result computed before an
+        # invalidation may be stale and is not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result, tables, generation=None):
+        """Store result unless the cache was invalidated since generation was read."""
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (result, set(tables))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, table=None):
+        """Drop entries that read table (or everything if table is None)."""
+        with self.lock:
+            self.generation += 1
+            if table is None:
+                self.entries.clear()
+                return
+            for key in [k for k, (_, tables) in self.entries.items() if table in tables]:
+                del self.entries[key]
+
+
+class WorldService:
+    """Read-only question answering over the world database."""
+
+    def __init__(self, db_path="db.sqlite", pool_size=4, cache_size=1024):
+        self.db_path = str(Path(db_path).resolve())
+
+        # WAL is a persistent database setting; it lets readers run while
+        # db.py imports. Read-only connections cannot switch it themselves.
+        rw = sqlite3.connect(self.db_path)
+        rw.execute("PRAGMA journal_mode = WAL;")
+        rw.close()
+
+        self.pool_size = pool_size
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(self.connect())
+
+        # A dedicated connection notices commits made by other processes
+        self.watch = self.connect()
+        self.watch_lock = threading.Lock()
+        self.data_version = self.current_data_version()
+
+        self.cache = ResultCache(cache_size)
+        self.watched = []  # WorldDB instances whose imports invalidate the cache
+
+    def watch_imports(self, db):
+        """Drop cached results that read a table when db (a WorldDB) imports it."""
+        db.listeners.append(self.cache.invalidate)
+        self.watched.append(db)
+
+    def connect(self):
+        uri = Path(self.db_path).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def current_data_version(self):
+        return self.watch.execute("PRAGMA data_version;").fetchone()[0]
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+
+    def check_external_changes(self):
+        """Drop the whole cache if another process committed to the database."""
+        with self.watch_lock:
+            version = self.current_data_version()
+            if version != self.data_version:
+                self.data_version = version
+                self.cache.invalidate()
+
+    def ask(self, name, **params):
+        """Answer a question from QUESTIONS; returns a list of row dicts."""
+        if name not in QUESTIONS:
+            raise QuestionError(f"Unknown question: {name}")
+        _, sql, param_names, tables = QUESTIONS[name]
+        missing = [p for p in param_names if p not in params]
+        if missing:
+            raise QuestionError(f"Missing parameter(s): {', '.join(missing)}")
+        values = tuple(str(params[p]) for p in param_names)
+
+        self.check_external_changes()
+        key = (name, values)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        # An import committed while the query runs invalidates the cache
+        # after our snapshot was taken; put() then drops the old rows
+        generation = self.cache.generation
+        with self.connection() as conn:
+            result = [dict(row) for row in conn.execute(sql, values).fetchall()]
+        self.cache.put(key, result, tables, generation)
+        return result
+
+    def stats(self):
+        return {
+            "cache_entries": len(self.cache.entries),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "pool_size": self.pool_size,
+        }
+
+    def close(self):
+        for db in self.watched:
+            db.listeners.remove(self.cache.invalidate)
+        self.watched = []
+        while not self.pool.empty():
+            self.pool.get().close()
+        self.watch.close()
+
+
+# ---------- HTTP/JSON endpoint ----------
+class Handler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts == ["questions"]:
+            self.send_json(200, {name: {"question": q[0], "params": q[2]}
+                                 for name, q in QUESTIONS.items()})
+        elif parts == ["stats"]:
+            self.send_json(200, self.service.stats())
+        elif len(parts) == 2 and parts[0] == "ask":
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                rows = self.service.ask(parts[1], **params)
+            except QuestionError as err:
+                self.send_json(400, {"error": str(err)})
+                return
+            except sqlite3.Error as err:
+                self.send_json(500, {"error": str(err)})
+                return
+            self.send_json(200, {"question": parts[1], "params": params, "rows": rows})
+        else:
+            self.send_json(404, {"error": "Use /questions, /stats or /ask/<question>?param=value"})
+
+    def log_message(self, format, *args):
+        pass  # keep the console quiet under dashboard load
+
+
+def serve(service, host="127.0.0.1", port=8000):
+    Handler.service = service
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving world questions on http://{host}:{port}/questions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only query service for the world database.")
+    parser.add_argument("--db", default="db.sqlite")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pool", type=int, default=4, help="read-only connections")
+    parser.add_argument("--cache", type=int, default=1024, help="cached results (LRU)")
+    args = parser.parse_args()
+
+    if not Path(args.db).is_file():
+        print(f"Database not found: {args.db} (import the CSV files with db.py first)")
+        sys.exit(1)
+    serve(WorldService(args.db, args.pool, args.cache), args.host, args.port)
+
+if __name__ == "__main__":
+    main()
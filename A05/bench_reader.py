@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: whole-tree ET.parse reader vs. streaming iterparse reader.
+
+Builds scaled-up CDXML documents by copying the fragments of the bundled
+rx*.cdxml files many times (with renumbered ids) into one page, then runs
+each reader in a fresh subprocess and reports wall time and peak RSS.
+
+Usage:
+    python bench_reader.py [--copies 100 1000 5000] [--image-kb 0] [--repeat 3]
+"""
+import os
+import sys
+import glob
+import json
+import copy
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import xml.etree.ElementTree as ET
+from cdxml_reader import read_cdxml
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+NS = "{http://www.cambridgesoft.com/xml/cdxml.dtd}"
+
+def legacy_read(cdxml_file):
+    """The original parse_cdxml_to_mol reading stage: ET.parse plus four tree walks."""
+    root = ET.parse(cdxml_file).getroot()
+    nodes = {}
+    bonds = []
+    for node in root.iter(NS + 'n'):
+        nodes[node.get('id')] = node.get('Element', '6')
+    if not nodes:
+        for node in root.iter('n'):
+            nodes[node.get('id')] = node.get('Element', '6')
+    for bond in root.iter(NS + 'b'):
+        bonds.append((bond.get('B'), bond.get('E'), bond.get('Order', '1')))
+    if not bonds:
+        for bond in root.iter('b'):
+            bonds.append((bond.get('B'), bond.get('E'), bond.get('Order', '1')))
+    return nodes, bonds
+
+READERS = {"etree": legacy_read, "iterparse": read_cdxml}
+
+def make_scaled(copies, out_path, image_kb=0):
+    """Write a CDXML document holding `copies` renumbered copies of all rx*.cdxml fragments."""
+    sources = sorted(glob.glob(os.path.join(HERE, "rx*.cdxml")))
+    fragments = []
+    for path in sources:
+        fragments.extend(ET.parse(path).getroot().iter("fragment"))
+
+    root = ET.Element("CDXML")
+    page = ET.SubElement(root, "page", id="1")
+    offset = 1000000
+    blob = "A" * (image_kb * 1024)
+
+    for k in range(copies):
+        for fragment in fragments:
+            clone = copy.deepcopy(fragment)
+            for elem in clone.iter():
+                for attr in ("id", "B", "E"):
+                    value = elem.get(attr)
+                    if value is not None and value.isdigit():
+                        elem.set(attr, str(int(value) + (k + 1) * offset))
+            page.append(clone)
+        if blob:
+            ET.SubElement(page, "embeddedobject", id=str(k)).text = blob
+
+    ET.ElementTree(root).write(out_path, encoding="UTF-8", xml_declaration=True)
+
+def measure(reader, cdxml_file):
+    """Run one reader in this process and print timing and peak RSS as JSON."""
+    start = time.perf_counter()
+    nodes, bonds = READERS[reader](cdxml_file)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024  # macOS reports bytes, Linux kilobytes
+    print(json.dumps({"seconds": seconds, "peak_rss_kb": peak,
+                      "atoms": len(nodes), "bonds": len(bonds)}))
+
+def run_one(reader, cdxml_file):
+    out = subprocess.run([sys.executable, __file__, "--measure", reader, cdxml_file],
+                         check=True, capture_output=True, text=True, cwd=HERE)
+    return json.loads(out.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CDXML readers.")
+    parser.add_argument("--copies", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="how many times to replicate the rx*.cdxml fragments")
+    parser.add_argument("--image-kb", type=int, default=0,
+                        help="size of a fake embedded image added per copy")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per reader; the fastest time is reported")
+    parser.add_argument("--measure", nargs=2, metavar=("READER", "FILE"),
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--generate", nargs=2, metavar=("COPIES", "FILE"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+    if args.generate:
+        make_scaled(int(args.generate[0]), args.generate[1], args.image_kb)
+        return
+
+    print(f"{'copies':>8} {'size MB':>8} {'reader':>10} {'atoms':>9} {'time s':>8} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for copies in args.copies:
+            path = os.path.join(tmp, f"scaled_{copies}.cdxml")
+            # Generate in a child too: Linux carries the parent's peak RSS
+            # over into forked children, which would skew the measurements.
+            subprocess.run([sys.executable, __file__, "--generate", str(copies), path,
+                            "--image-kb", str(args.image_kb)], check=True, cwd=HERE)
+            size_mb = os.path.getsize(path) / 1e6
+
+            for reader in READERS:
+                runs = [run_one(reader, path) for _ in range(args.repeat)]
+                best = min(r["seconds"] for r in runs)
+                peak = max(r["peak_rss_kb"] for r in runs) / 1024
+                print(f"{copies:>8} {size_mb:>8.1f} {reader:>10} {runs[0]['atoms']:>9} "
+                      f"{best:>8.3f} {peak:>12.1f}")
+
+if __name__ == "__main__":
+    main()
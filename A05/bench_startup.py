@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: startup and per-job latency of cdxml2csv.py.
+
+Runs short cdxml2csv.py invocations in fresh interpreters, the way a
+pipeline calls it: --help, the "No .cdxml files" error, converting one
+file locally and converting the same file through a --serve daemon (which
+the benchmark starts and stops itself). For each case it reports the
+wall time and, from a run with `python -X importtime`, the total import
+time and the slowest top-level imports.
+
+Usage:
+    python bench_startup.py [--repeat 10] [--file rx00252.cdxml] [--top 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+SCRIPT = os.path.join(HERE, "cdxml2csv.py")
+
+def cases(cdxml_file, socket_path):
+    return [
+        ("--help", ["--help"]),
+        ("no files", []),
+        ("1 file, local", ["--jobs", "1", cdxml_file]),
+        ("1 file, daemon", ["--daemon", socket_path, cdxml_file]),
+    ]
+
+def run(args, cwd, importtime=False):
+    """Run cdxml2csv.py once in cwd (where it writes cdxml2csv.csv); return (wall seconds, stderr)."""
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + [SCRIPT] + args
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
+    return time.perf_counter() - start, proc.stderr
+
+def parse_importtime(stderr):
+    """Return (total ms, [(ms, module)] of top-level imports) from -X importtime output."""
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" ") or name.startswith("  "):
+            continue  # nested import, already counted in its parent
+        top.append((int(cumulative) / 1000, name.strip()))
+    return sum(ms for ms, _ in top), sorted(top, reverse=True)
+
+def start_daemon(socket_path):
+    proc = subprocess.Popen([sys.executable, SCRIPT, "--serve", socket_path, "--jobs", "1"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=HERE)
+    deadline = time.time() + 60
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None or time.time() > deadline:
+            raise SystemExit("The cdxml2csv daemon did not start")
+        time.sleep(0.05)
+    return proc
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and per-job latency of cdxml2csv.py.")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per case")
+    parser.add_argument("--file", default="rx00252.cdxml", help="CDXML file to convert")
+    parser.add_argument("--top", type=int, default=3, help="slowest imports shown per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "cdxml2csv.sock")
+        daemon = start_daemon(socket_path)
+        try:
+            print(f"{'case':>16} {'median ms':>10} {'min ms':>8} {'imports ms':>11}  slowest imports")
+            cdxml_file = os.path.abspath(args.file)
+            for label, case_args in cases(cdxml_file, socket_path):
+                times = [run(case_args, tmp)[0] * 1000 for _ in range(args.repeat)]
+                total, top = parse_importtime(run(case_args, tmp, importtime=True)[1])
+                slowest = ", ".join(f"{name} {ms:.0f}" for ms, name in top[:args.top])
+                print(f"{label:>16} {statistics.median(times):>10.1f} {min(times):>8.1f} "
+                      f"{total:>11.1f}  {slowest}")
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+if __name__ == "__main__":
+    main()
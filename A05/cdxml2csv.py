@@ -2,11 +2,13 @@
 import sys
 import csv
 import os
-import xml.etree.ElementTree as ET
-from rdkit import Chem
-from rdkit.Chem import AllChem, MACCSkeys, rdmolfiles
-from openpyxl import Workbook
-from openpyxl.styles import Font, Border, Side
+import argparse
+import threading
+# RDKit and the process pool are imported where they are used: loading
+# RDKit takes longer than converting a typical file, and --help, usage
+# errors and --daemon clients never need it. The same goes for the XML
+# reader and the SQLite result cache.
+from cdxml_sinks import SINKS, XlsxSink, open_sinks
 
 def is_csv_name(arg):
     """Return True if argument is a CSV filename."""
@@ -16,106 +18,287 @@ def count_bits(bits_tuple):
     """Count how many bits are set to 1 in the MACCS fingerprint."""
     return sum(bits_tuple)
 
-def parse_cdxml_to_mol(cdxml_file):
+def report(messages, text):
+    """Collect a message if a list is given, otherwise print it."""
+    if messages is None:
+        print(text)
+    else:
+        messages.append(text)
+
+def parse_cdxml_to_mol(cdxml_file, messages=None):
     """Parse CDXML file and create an RDKit molecule."""
+    from cdxml_reader import read_cdxml
+
     try:
-        tree = ET.parse(cdxml_file)
-        root = tree.getroot()
-        
-        # Find all nodes (atoms) and bonds
-        nodes = {}
-        bonds = []
-        
-        # Parse nodes (atoms)
-        for node in root.iter('{http://www.cambridgesoft.com/xml/cdxml.dtd}n'):
-            node_id = node.get('id')
-            element = node.get('Element', '6')  # Default to carbon (atomic number 6)
-            # If no Element attribute, it's likely carbon
-            nodes[node_id] = element
-        
-        # If we find nodes without namespace, try without namespace
-        if not nodes:
-            for node in root.iter('n'):
-                node_id = node.get('id')
-                element = node.get('Element', '6')  # Default to carbon
-                nodes[node_id] = element
-        
-        # Parse bonds
-        for bond in root.iter('{http://www.cambridgesoft.com/xml/cdxml.dtd}b'):
-            begin = bond.get('B')
-            end = bond.get('E')
-            order = bond.get('Order', '1')  # Default to single bond
-            bonds.append((begin, end, order))
-        
-        # If we find bonds without namespace, try without namespace
-        if not bonds:
-            for bond in root.iter('b'):
-                begin = bond.get('B')
-                end = bond.get('E')
-                order = bond.get('Order', '1')
-                bonds.append((begin, end, order))
-        
-        if not nodes:
-            return None
-        
-        # Create RDKit molecule
-        mol = Chem.RWMol()
-        atom_map = {}
-        
-        # Add atoms
-        for node_id, element in nodes.items():
+        nodes, bonds = read_cdxml(cdxml_file)
+        return build_mol(nodes, bonds, cdxml_file, messages)
+    except Exception as e:
+        report(messages, f"Error parsing {cdxml_file}: {e}")
+        return None
+
+def iter_cdxml_mols(cdxml_file, messages=None):
+    """Yield one RDKit molecule per fragment/reaction component of a CDXML file."""
+    from cdxml_reader import iter_fragments
+
+    try:
+        for nodes, bonds in iter_fragments(cdxml_file):
+            mol = build_mol(nodes, bonds, cdxml_file, messages)
+            if mol is not None:
+                yield mol
+    except Exception as e:
+        report(messages, f"Error parsing {cdxml_file}: {e}")
+
+def build_mol(nodes, bonds, cdxml_file, messages=None):
+    """Build an RDKit molecule from CDXML atoms and bonds."""
+    from rdkit import Chem
+
+    if not nodes:
+        return None
+    
+    # Create RDKit molecule
+    mol = Chem.RWMol()
+    atom_map = {}
+    
+    # Add atoms
+    for node_id, element in nodes.items():
+        try:
+            atomic_num = int(element)
+        except:
+            atomic_num = 6  # Default to carbon
+        atom = Chem.Atom(atomic_num)
+        idx = mol.AddAtom(atom)
+        atom_map[node_id] = idx
+    
+    # Add bonds
+    for begin, end, order in bonds:
+        if begin in atom_map and end in atom_map:
             try:
-                atomic_num = int(element)
+                bond_order = int(float(order))
+                if bond_order == 1:
+                    bond_type = Chem.BondType.SINGLE
+                elif bond_order == 2:
+                    bond_type = Chem.BondType.DOUBLE
+                elif bond_order == 3:
+                    bond_type = Chem.BondType.TRIPLE
+                else:
+                    bond_type = Chem.BondType.SINGLE
+                mol.AddBond(atom_map[begin], atom_map[end], bond_type)
             except:
-                atomic_num = 6  # Default to carbon
-            atom = Chem.Atom(atomic_num)
-            idx = mol.AddAtom(atom)
-            atom_map[node_id] = idx
-        
-        # Add bonds
-        for begin, end, order in bonds:
-            if begin in atom_map and end in atom_map:
-                try:
-                    bond_order = int(float(order))
-                    if bond_order == 1:
-                        bond_type = Chem.BondType.SINGLE
-                    elif bond_order == 2:
-                        bond_type = Chem.BondType.DOUBLE
-                    elif bond_order == 3:
-                        bond_type = Chem.BondType.TRIPLE
-                    else:
-                        bond_type = Chem.BondType.SINGLE
-                    mol.AddBond(atom_map[begin], atom_map[end], bond_type)
-                except:
-                    mol.AddBond(atom_map[begin], atom_map[end], Chem.BondType.SINGLE)
-        
-        # Convert to regular molecule and add hydrogens
-        mol = mol.GetMol()
-        mol_with_h = None
+                mol.AddBond(atom_map[begin], atom_map[end], Chem.BondType.SINGLE)
+    
+    # Convert to regular molecule and add hydrogens
+    mol = mol.GetMol()
+    mol_with_h = None
+    try:
+        Chem.SanitizeMol(mol)
+        mol_with_h = Chem.AddHs(mol)
+    except:
+        # Try sanitizing without strict valence checking
         try:
-            Chem.SanitizeMol(mol)
+            Chem.SanitizeMol(mol, sanitizeOps=Chem.SANITIZE_ALL^Chem.SANITIZE_PROPERTIES)
             mol_with_h = Chem.AddHs(mol)
-        except:
-            # Try sanitizing without strict valence checking
+        except Exception as e:
+            report(messages, f"Warning: Sanitization issues in {cdxml_file}: {e}")
+            # Continue with molecule without added H
+            mol_with_h = mol
+    
+    # Return molecule with H if successful, otherwise without
+    return mol_with_h if mol_with_h is not None else mol
+
+# Messages of the file being converted in this thread; the daemon adds
+# RDKit's log lines to them, see collect_rdkit_log()
+rdkit_log = threading.local()
+
+def collect_rdkit_log():
+    """Return RDKit's log lines with the messages of each file instead of printing them."""
+    import logging
+    from rdkit import rdBase
+
+    class Collector(logging.Handler):
+        def emit(self, record):
+            messages = getattr(rdkit_log, "messages", None)
+            if messages is None:  # not inside convert_file()
+                sys.stderr.write(self.format(record) + "\n")
+            else:
+                messages.append(record.getMessage())
+
+    rdBase.LogToPythonLogger()
+    logging.getLogger("rdkit").handlers = [Collector()]
+
+def convert_file(filename):
+    """
+    Convert one CDXML file to (filename, smiles, bits_list, messages).
+
+    Runs in pool workers, so messages are returned instead of printed.
+    bits_list is None when the file could not be converted.
+    """
+    messages = []
+    rdkit_log.messages = messages
+    try:
+        return convert_into(filename, messages)
+    finally:
+        rdkit_log.messages = None
+
+def convert_into(filename, messages):
+    from rdkit import Chem
+    from rdkit.Chem import MACCSkeys
+
+    try:
+        mol = parse_cdxml_to_mol(filename, messages)
+        if mol is None:
+            messages.append(f"Could not parse {filename}")
+            return filename, None, None, messages
+
+        # Extract SMILES (remove hydrogens first for canonical SMILES)
+        try:
+            mol_no_h = Chem.RemoveHs(mol)
+            smiles = Chem.MolToSmiles(mol_no_h)
+        except Exception as e:
+            # If removing H fails, generate SMILES from original mol without explicit H in output
             try:
-                Chem.SanitizeMol(mol, sanitizeOps=Chem.SANITIZE_ALL^Chem.SANITIZE_PROPERTIES)
-                mol_with_h = Chem.AddHs(mol)
-            except Exception as e:
-                print(f"Warning: Sanitization issues in {cdxml_file}: {e}")
-                # Continue with molecule without added H
-                mol_with_h = mol
-        
-        # Return molecule with H if successful, otherwise without
-        return mol_with_h if mol_with_h is not None else mol
-        
+                smiles = Chem.MolToSmiles(mol, allHsExplicit=False)
+                messages.append(f"Note: Using non-canonical SMILES for {filename}")
+            except:
+                messages.append(f"Warning: Could not generate SMILES for {filename}: {e}")
+                smiles = "N/A"
+
+        # MACCS fingerprint
+        try:
+            fp = MACCSkeys.GenMACCSKeys(mol)
+            # Get list of bit indices that are set to 1 (similar to pybel's .bits)
+            bits_list = [i for i, bit in enumerate(fp.ToBitString()) if bit == '1']
+        except Exception as e:
+            messages.append(f"Could not calculate MACCS for {filename}: {e}")
+            return filename, smiles, None, messages
+
+        return filename, smiles, bits_list, messages
+
     except Exception as e:
-        print(f"Error parsing {cdxml_file}: {e}")
+        # Never let one broken file take down the whole batch
+        messages.append(f"Error converting {filename}: {e}")
+        return filename, None, None, messages
+
+def iter_results(cdxml_files, jobs=1, cache=None, convert=None):
+    """
+    Yield convert_file() results in input order, using a process pool if jobs > 1.
+
+    With a ResultCache, only files whose content is not cached are converted.
+    convert(files, jobs) replaces convert_all, e.g. to send the files to a daemon.
+    """
+    convert = convert or convert_all
+    if cache is None:
+        yield from convert(cdxml_files, jobs)
+        return
+
+    keys = [cache.key_for(f) for f in cdxml_files]
+    cached = [cache.get(key, f) for key, f in zip(keys, cdxml_files)]
+    todo = [f for f, hit in zip(cdxml_files, cached) if hit is None]
+    converted = convert(todo, jobs)
+
+    for key, hit in zip(keys, cached):
+        if hit is not None:
+            yield hit
+        else:
+            result = next(converted)
+            cache.put(key, result)
+            yield result
+
+def convert_all(cdxml_files, jobs=1, pool=None):
+    """
+    Yield convert_file() results in input order, using a process pool if jobs > 1.
+
+    An already running pool (the daemon's) is used instead of starting one.
+    """
+    if jobs <= 1 or len(cdxml_files) < 2:
+        yield from map(convert_file, cdxml_files)
+        return
+
+    # Small chunks keep rows flowing to the CSV while amortizing IPC overhead
+    chunksize = max(1, min(64, len(cdxml_files) // (jobs * 4)))
+    if pool is not None:
+        yield from pool.map(convert_file, cdxml_files, chunksize=chunksize)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(convert_file, cdxml_files, chunksize=chunksize)
+
+def serve(socket_path, jobs):
+    """Run the conversion daemon with RDKit (and the worker pool) loaded once."""
+    from rdkit import Chem
+    from rdkit.Chem import MACCSkeys
+    from concurrent.futures import ProcessPoolExecutor
+    import cdxml_daemon
+
+    # RDKit warnings go back to the client with the other messages
+    collect_rdkit_log()
+    # Workers are forked after RDKit is imported, so they start warm too
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=collect_rdkit_log) if jobs > 1 else None
+    try:
+        cdxml_daemon.serve(socket_path, lambda files: convert_all(files, jobs, pool))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def daemon_converter(socket_path):
+    """Return a convert(files, jobs) that uses the daemon, or None if it is not running."""
+    import cdxml_daemon
+
+    try:
+        sock = cdxml_daemon.connect(socket_path)
+    except OSError as e:
+        print(f"No cdxml2csv daemon at {socket_path} ({e}), converting locally")
         return None
 
+    def convert(files, jobs):
+        done = 0
+        try:
+            for result in cdxml_daemon.convert_remote(sock, files):
+                yield result
+                done += 1
+        except (OSError, ValueError, RuntimeError) as e:
+            # The daemon failed or went away: convert the rest here, as a local run would
+            print(f"cdxml2csv daemon failed ({e}), converting the remaining {len(files) - done} files locally")
+            sock.close()
+            yield from convert_all(files[done:], jobs)
+    return convert
+
+def parse_args(argv):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Convert ChemDraw CDXML files to CSV and a formatted Excel file.",
+        usage="python cdxml2csv.py [--jobs N] [--cache-dir DIR] [--formats csv,parquet,xlsx] "
+              "[--daemon SOCKET] *.cdxml [output.csv]\n"
+              "       python cdxml2csv.py --serve SOCKET [--jobs N]")
+    parser.add_argument("files", nargs="*",
+                        help=".cdxml input files, optionally followed by the output .csv name")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--cache-dir",
+                        help="directory of a persistent result cache; unchanged files are not re-parsed")
+    parser.add_argument("--formats", default="csv",
+                        help="comma-separated outputs: " + ", ".join(SINKS) + " (default: csv)")
+    parser.add_argument("--serve", metavar="SOCKET",
+                        help="run as a daemon that keeps RDKit loaded and converts files for --daemon clients")
+    parser.add_argument("--daemon", metavar="SOCKET", default=os.environ.get("CDXML2CSV_DAEMON"),
+                        help="let the daemon at SOCKET convert the files (default: $CDXML2CSV_DAEMON); "
+                             "converts locally if it is not running")
+    options = parser.parse_args(argv)
+
+    options.formats = [f.strip().lower() for f in options.formats.split(",") if f.strip()]
+    unknown = [f for f in options.formats if f not in SINKS]
+    if unknown or not options.formats:
+        parser.error(f"unknown output format(s): {', '.join(unknown) or '(none)'}")
+    return options
+
 def main():
-    args = sys.argv[1:]
+    options = parse_args(sys.argv[1:])
+    if options.serve:
+        serve(options.serve, options.jobs)
+        return
+
+    args = options.files
     if not args:
-        print("Usage: python cdxml2csv.py *.cdxml [output.csv]")
+        print("Usage: python cdxml2csv.py [--jobs N] *.cdxml [output.csv]")
         sys.exit(1)
 
     # Default CSV output name
@@ -135,112 +318,55 @@ def main():
         print("No .cdxml files provided.")
         sys.exit(1)
 
-    # Open CSV for writing
-    with open(output_csv, "w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile, delimiter=";")
-        writer.writerow(["name", "smiles", "maccs"])
+    cache = None
+    if options.cache_dir:
+        from cdxml_cache import ResultCache
+        cache = ResultCache(options.cache_dir)
+    convert = daemon_converter(options.daemon) if options.daemon else None
 
-        max_bits = -1
-        max_file = None
+    # Every sink is written in the same single pass over the results
+    sinks = open_sinks(options.formats, output_csv)
+    max_bits = -1
+    max_file = None
 
-        # Process each CDXML file
-        for filename in cdxml_files:
-            mol = parse_cdxml_to_mol(filename)
-            if mol is None:
-                print(f"Could not parse {filename}")
-                continue
-
-            # Extract SMILES (remove hydrogens first for canonical SMILES)
-            try:
-                mol_no_h = Chem.RemoveHs(mol)
-                smiles = Chem.MolToSmiles(mol_no_h)
-            except Exception as e:
-                # If removing H fails, try generating SMILES from original mol without explicit H in output
-                try:
-                    # For molecules with weird valence, use the allHsExplicit=False to suppress them in SMILES
-                    mol_copy = Chem.Mol(mol)
-                    for atom in mol_copy.GetAtoms():
-                        if atom.GetAtomicNum() == 1:  # If it's hydrogen
-                            continue
-                    smiles = Chem.MolToSmiles(mol, allHsExplicit=False)
-                    print(f"Note: Using non-canonical SMILES for {filename}")
-                except:
-                    print(f"Warning: Could not generate SMILES for {filename}: {e}")
-                    smiles = "N/A"
-
-            # MACCS fingerprint
-            try:
-                fp = MACCSkeys.GenMACCSKeys(mol)
-                # Get list of bit indices that are set to 1 (similar to pybel's .bits)
-                bits_list = [i for i, bit in enumerate(fp.ToBitString()) if bit == '1']
-                bit_count = len(bits_list)
-            except Exception as e:
-                print(f"Could not calculate MACCS for {filename}: {e}")
+    try:
+        # Results arrive in input order; each row is written as soon as it is ready
+        for filename, smiles, bits_list, messages in iter_results(cdxml_files, options.jobs, cache, convert):
+            for message in messages:
+                print(message)
+            if bits_list is None:
                 continue
 
             # Track molecule with highest bit count
+            bit_count = len(bits_list)
             if bit_count > max_bits:
                 max_bits = bit_count
                 max_file = filename
 
-            # Write CSV row - format bits_list as a string representation
-            writer.writerow([
-                filename,
-                smiles,
-                str(bits_list)
-            ])
+            for sink in sinks:
+                sink.write(filename, smiles, bits_list)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    if cache is not None:
+        cache.close()
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses")
 
     print(f"Molecule with the most MACCS bits: {max_file} ({max_bits} bits set)")
-    
-    # Create formatted Excel file
-    create_excel_file(output_csv)
 
 def create_excel_file(csv_file):
-    """Create a formatted Excel file from the CSV."""
+    """Create a formatted Excel file from an existing cdxml2csv CSV file."""
     xlsx_file = csv_file.replace('.csv', '.xlsx')
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "CDXML Data"
-    
-    # Read CSV and write to Excel
-    with open(csv_file, 'r', encoding='utf-8') as f:
+    sink = XlsxSink(xlsx_file)
+
+    # Stream rows straight into the write-only workbook
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
         reader = csv.reader(f, delimiter=';')
-        for row_idx, row in enumerate(reader, start=1):
-            for col_idx, value in enumerate(row, start=1):
-                ws.cell(row=row_idx, column=col_idx, value=value)
-    
-    # Define border styles
-    left_border = Border(left=Side(style='thin'))
-    right_border = Border(right=Side(style='thin'))
-    left_right_border = Border(left=Side(style='thin'), right=Side(style='thin'))
-    bottom_right_border = Border(bottom=Side(style='thin'), right=Side(style='thin'))
-    bottom_left_right_border = Border(bottom=Side(style='thin'), left=Side(style='thin'), right=Side(style='thin'))
-    bottom_left_border = Border(bottom=Side(style='thin'), left=Side(style='thin'))
-    
-    # Format header row (bold and borders)
-    ws.cell(row=1, column=1).font = Font(bold=True)
-    ws.cell(row=1, column=1).border = bottom_right_border
-    ws.cell(row=1, column=2).font = Font(bold=True)
-    ws.cell(row=1, column=2).border = bottom_left_right_border
-    ws.cell(row=1, column=3).font = Font(bold=True)
-    ws.cell(row=1, column=3).border = bottom_left_border
-    
-    # Add column borders to data cells
-    max_row = ws.max_row
-    for row_idx in range(2, max_row + 1):
-        ws.cell(row=row_idx, column=1).border = right_border
-        ws.cell(row=row_idx, column=2).border = left_right_border
-        ws.cell(row=row_idx, column=3).border = left_border
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 20
-    ws.column_dimensions['B'].width = 50
-    ws.column_dimensions['C'].width = 80
-    
-    # Save the workbook
-    wb.save(xlsx_file)
-    print(f"Formatted Excel file created: {xlsx_file}")
+        next(reader, None)  # the sink writes its own header
+        for row in reader:
+            sink.write_row(row)
+    sink.close()
 
 if __name__ == "__main__":
     main()
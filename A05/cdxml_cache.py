@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Persistent result cache for cdxml2csv.py.
+
+Results are stored in a small SQLite database and keyed by a hash of the
+CDXML file content together with the RDKit version, so unchanged files are
+never parsed again while a new RDKit release invalidates old entries.
+"""
+import os
+import json
+import hashlib
+import sqlite3
+
+# Bump when the conversion logic in cdxml2csv.py changes its output
+CACHE_FORMAT = 1
+
+# Placeholder for the file name inside cached messages
+NAME_MARK = "\x00name\x00"
+
+class ResultCache:
+    """SQLite-backed cache of (smiles, bits_list, messages) per CDXML content."""
+
+    def __init__(self, cache_dir, commit_every=500):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "cdxml2csv_cache.sqlite")
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, smiles TEXT, maccs TEXT, messages TEXT);"
+        )
+        self.commit_every = commit_every
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, filename):
+        """Return the cache key for a file, or None if it cannot be read."""
+        from rdkit import rdBase  # only the version; much lighter than rdkit.Chem
+
+        digest = hashlib.sha256()
+        digest.update(f"{rdBase.rdkitVersion}:{CACHE_FORMAT}:".encode())
+        try:
+            with open(filename, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def get(self, key, filename):
+        """Return a cached convert_file() result for filename, or None on a miss."""
+        row = None
+        if key is not None:
+            row = self.conn.execute(
+                "SELECT smiles, maccs, messages FROM results WHERE key = ?;", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        smiles, maccs, messages = row
+        messages = [m.replace(NAME_MARK, filename) for m in json.loads(messages)]
+        return filename, smiles, json.loads(maccs), messages
+
+    def put(self, key, result):
+        """Store a successful convert_file() result under key."""
+        filename, smiles, bits_list, messages = result
+        if key is None or bits_list is None:
+            return  # failures are retried on the next run
+
+        messages = [m.replace(filename, NAME_MARK) for m in messages]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?);",
+            (key, smiles, json.dumps(bits_list), json.dumps(messages))
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Conversion daemon for cdxml2csv.py on a local Unix socket.
+
+Importing RDKit takes longer than converting a typical CDXML file, so a
+pipeline that runs cdxml2csv.py thousands of times spends most of its time
+starting up. `cdxml2csv.py --serve SOCKET` keeps RDKit (and the worker
+pool) loaded and converts files for clients started with
+`cdxml2csv.py --daemon SOCKET`, which never import RDKit themselves.
+
+Protocol, one JSON document per line:
+    client -> {"files": ["/abs/path/a.cdxml", ...]}
+    daemon -> [filename, smiles, bits_list, messages]   one per file, in order
+    daemon -> {"done": true, "seconds": 0.012}            or {"error": "..."}
+A connection may send several requests.
+"""
+import os
+import json
+import time
+import signal
+import socket
+import socketserver
+
+def connect(socket_path, timeout=None):
+    """Connect to a running daemon; raises OSError if there is none."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def convert_remote(sock, cdxml_files):
+    """Yield convert_file() results for cdxml_files from the daemon, in input order."""
+    paths = [os.path.abspath(f) for f in cdxml_files]
+    with sock.makefile("rwb") as stream:
+        stream.write(json.dumps({"files": paths}).encode("utf-8") + b"\n")
+        stream.flush()
+        for name, path in zip(cdxml_files, paths):
+            answer = read_answer(stream)
+            if isinstance(answer, dict):
+                raise RuntimeError(answer.get("error", answer))
+            _, smiles, bits_list, messages = answer
+            # Report files under the name the user gave, as a local run does
+            yield name, smiles, bits_list, [m.replace(path, name) for m in messages]
+        read_answer(stream)  # {"done": ...}
+
+def read_answer(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("cdxml2csv daemon closed the connection")
+    return json.loads(line)
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            start = time.perf_counter()
+            try:
+                files = json.loads(line)["files"]
+                for result in self.server.convert(files):
+                    self.send(list(result))
+                self.server.count(len(files), time.perf_counter() - start)
+                self.send({"done": True, "seconds": round(time.perf_counter() - start, 6)})
+            except (BrokenPipeError, ConnectionResetError):
+                return  # the client went away
+            except Exception as e:
+                self.send({"error": f"{type(e).__name__}: {e}"})
+
+    def send(self, obj):
+        self.wfile.write(json.dumps(obj).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+class ConversionServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, convert):
+        self.convert = convert
+        self.requests = self.files = 0
+        self.seconds = 0.0
+        super().__init__(socket_path, Handler)
+
+    def count(self, files, seconds):
+        self.requests += 1
+        self.files += files
+        self.seconds += seconds
+
+def serve(socket_path, convert):
+    """Answer conversion requests on socket_path until interrupted; convert(files) yields results."""
+    if os.path.exists(socket_path):
+        try:
+            connect(socket_path, timeout=1).close()
+        except OSError:
+            os.remove(socket_path)  # left over from a daemon that was killed
+        else:
+            raise SystemExit(f"A daemon is already listening on {socket_path}")
+
+    umask = os.umask(0o177)  # socket file mode 0600: only this user may send jobs
+    try:
+        server = ConversionServer(socket_path, convert)
+    finally:
+        os.umask(umask)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)  # clean up the socket on kill, too
+    print(f"cdxml2csv daemon listening on {socket_path} (pid {os.getpid()}), Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+        mean = server.seconds / server.requests * 1000 if server.requests else 0.0
+        print(f"Served {server.requests} requests, {server.files} files "
+              f"(mean {mean:.1f} ms per request)")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Streaming CDXML reader.
+
+Reads atoms (<n>) and bonds (<b>) in a single iterparse pass, accepting the
+namespaced and the bare tag form at the same time. Elements are cleared as
+soon as they are processed, so memory use stays flat even for documents
+with embedded images or many fragments.
+"""
+import xml.etree.ElementTree as ET
+
+CDXML_NS = "{http://www.cambridgesoft.com/xml/cdxml.dtd}"
+
+def local_name(tag):
+    """Return the tag without the CDXML namespace (other namespaces are kept)."""
+    if tag.startswith(CDXML_NS):
+        return tag[len(CDXML_NS):]
+    return tag
+
+def iter_fragments(cdxml_file):
+    """
+    Yield (nodes, bonds) for every top-level fragment of a CDXML document.
+
+    nodes maps node id -> element number (string, carbon if missing) and
+    bonds is a list of (begin, end, order). Atoms and bonds nested in
+    abbreviations belong to their enclosing fragment. Atoms and bonds found
+    outside any fragment are yielded last as one extra group.
+    """
+    nodes, bonds = {}, []
+    loose_nodes, loose_bonds = {}, []
+    fragment_depth = 0
+    stack = []
+
+    for event, elem in ET.iterparse(cdxml_file, events=("start", "end")):
+        tag = local_name(elem.tag)
+
+        if event == "start":
+            stack.append(elem)
+            if tag == "fragment":
+                fragment_depth += 1
+            elif tag == "n":
+                target = nodes if fragment_depth else loose_nodes
+                target[elem.get("id")] = elem.get("Element", "6")  # Default to carbon
+            elif tag == "b":
+                target = bonds if fragment_depth else loose_bonds
+                target.append((elem.get("B"), elem.get("E"), elem.get("Order", "1")))
+            continue
+
+        # Attributes were consumed on "start"; drop the element and its
+        # already-finished siblings so the tree never grows.
+        stack.pop()
+        elem.clear()
+        if stack:
+            stack[-1].clear()
+
+        if tag == "fragment":
+            fragment_depth -= 1
+            if fragment_depth == 0 and nodes:
+                yield nodes, bonds
+                nodes, bonds = {}, []
+
+    if loose_nodes:
+        yield loose_nodes, loose_bonds
+
+def read_cdxml(cdxml_file):
+    """Return (nodes, bonds) of all fragments of a CDXML document merged together."""
+    nodes, bonds = {}, []
+    for fragment_nodes, fragment_bonds in iter_fragments(cdxml_file):
+        nodes.update(fragment_nodes)
+        bonds.extend(fragment_bonds)
+    return nodes, bonds
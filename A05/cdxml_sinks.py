@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Output sinks for cdxml2csv.py.
+
+Every sink writes rows in one streaming pass straight from the conversion
+results: write(name, smiles, bits_list) for each molecule, then close().
+Optional libraries (pyarrow, openpyxl) are imported only when their sink
+is used.
+"""
+import os
+import csv
+
+N_MACCS_BITS = 167
+FP_BYTES = (N_MACCS_BITS + 7) // 8
+
+def pack_maccs(bits_list):
+    """Pack MACCS bit indices into fixed-width bytes (bit i -> byte i // 8, bit i % 8)."""
+    packed = bytearray(FP_BYTES)
+    for bit in bits_list:
+        packed[bit >> 3] |= 1 << (bit & 7)
+    return bytes(packed)
+
+class CsvSink:
+    """Semicolon-separated CSV with the MACCS bits as a list string."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file, delimiter=";")
+        self.writer.writerow(["name", "smiles", "maccs"])
+
+    def write(self, name, smiles, bits_list):
+        self.writer.writerow([name, smiles, str(bits_list)])
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    """Parquet file with the MACCS fingerprint stored as 21-byte fixed-width binary."""
+
+    def __init__(self, path, batch_size=10000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = pa.schema([
+            ("name", pa.string()),
+            ("smiles", pa.string()),
+            ("maccs", pa.binary(FP_BYTES)),
+            ("maccs_count", pa.uint8()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = ([], [], [], [])
+
+    def write(self, name, smiles, bits_list):
+        names, smiles_col, fps, counts = self.rows
+        names.append(name)
+        smiles_col.append(smiles)
+        fps.append(pack_maccs(bits_list))
+        counts.append(len(bits_list))
+        if len(names) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows[0]:
+            return
+        batch = self.pa.RecordBatch.from_arrays(
+            [self.pa.array(col, type=field.type) for col, field in zip(self.rows, self.schema)],
+            schema=self.schema)
+        self.writer.write_batch(batch)
+        self.rows = ([], [], [], [])
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        print(f"Parquet file created: {self.path}")
+
+class XlsxSink:
+    """Formatted Excel file written with openpyxl's write-only mode and shared styles."""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, Border, Side
+
+        self.path = path
+        self.cell_class = WriteOnlyCell
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("CDXML Data")
+
+        # One style object per column, shared by every cell
+        thin = Side(style='thin')
+        bold = Font(bold=True)
+        self.data_borders = [
+            Border(right=thin),
+            Border(left=thin, right=thin),
+            Border(left=thin),
+        ]
+
+        # Column widths must be set before the first row in write-only mode
+        self.ws.column_dimensions['A'].width = 20
+        self.ws.column_dimensions['B'].width = 50
+        self.ws.column_dimensions['C'].width = 80
+
+        header_borders = [
+            Border(bottom=thin, right=thin),
+            Border(bottom=thin, left=thin, right=thin),
+            Border(bottom=thin, left=thin),
+        ]
+        self._append(["name", "smiles", "maccs"], header_borders, bold)
+
+    def write_row(self, values):
+        """Append one already formatted data row."""
+        self._append(values, self.data_borders)
+
+    def _append(self, values, borders, font=None):
+        row = []
+        for value, border in zip(values, borders):
+            cell = self.cell_class(self.ws, value=value)
+            cell.border = border
+            if font is not None:
+                cell.font = font
+            row.append(cell)
+        self.ws.append(row)
+
+    def write(self, name, smiles, bits_list):
+        self.write_row([name, smiles, str(bits_list)])
+
+    def close(self):
+        self.wb.save(self.path)
+        print(f"Formatted Excel file created: {self.path}")
+
+SINKS = {"csv": CsvSink, "parquet": ParquetSink, "xlsx": XlsxSink}
+
+def open_sinks(formats, output_csv):
+    """Open one sink per requested format; non-CSV outputs share the CSV base name."""
+    base = os.path.splitext(output_csv)[0]
+    sinks = []
+    for fmt in formats:
+        path = output_csv if fmt == "csv" else f"{base}.{fmt}"
+        sinks.append(SINKS[fmt](path))
+    return sinks
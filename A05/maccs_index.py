@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+MACCS similarity search over cdxml2csv output.
+
+The 167-bit MACCS fingerprints from the CSV are packed into a contiguous
+uint64 array (3 words per molecule) and saved as .npy files that are opened
+memory-mapped, so queries never touch the CSV again. Tanimoto similarity is
+computed with vectorized popcounts over the whole library.
+
+Usage:
+    python maccs_index.py build cdxml2csv.csv [--index PREFIX]
+    python maccs_index.py query PREFIX (--name NAME | --bits "[1, 2]" | --smiles SMILES)
+                                [--top K] [--threshold T]
+    python maccs_index.py pairs PREFIX --threshold T [--block N] [-o pairs.csv]
+
+The index consists of PREFIX.fp.npy (fingerprints), PREFIX.count.npy
+(bits set per molecule), PREFIX.names.txt and PREFIX.offsets.npy (byte
+offset of every name, so result names are read without loading the list).
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+import numpy as np
+
+N_BITS = 167
+N_WORDS = 3  # 3 x 64 bits hold the 167 MACCS bits
+CHUNK = 100000
+
+# ---------- bit helpers ----------
+if hasattr(np, "bitwise_count"):
+    def _word_counts(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _word_counts(words):
+        as_bytes = np.ascontiguousarray(words).view(np.uint8)
+        shape = as_bytes.shape[:-1] + (as_bytes.shape[-1] // 8, 8)
+        return _BYTE_COUNTS[as_bytes].reshape(shape).sum(axis=-1, dtype=np.uint8)
+
+def popcount(words):
+    """Number of set bits along the last (3-word) axis of a uint64 array, as uint8."""
+    counts = _word_counts(words)
+    # Explicit adds are much faster than .sum() over a length-3 axis
+    return counts[..., 0] + counts[..., 1] + counts[..., 2]
+
+def pack_bits(bit_lists):
+    """Pack lists of set bit indices into an (n, 3) uint64 array."""
+    dense = np.zeros((len(bit_lists), N_WORDS * 64), dtype=bool)
+    for row, bits in enumerate(bit_lists):
+        dense[row, bits] = True
+    packed = np.packbits(dense, axis=1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64, copy=False)
+
+def parse_bits(text):
+    """Parse the '[1, 2, 3]' MACCS column written by cdxml2csv.py."""
+    text = text.strip().strip("[]")
+    return [int(b) for b in text.split(",") if b.strip()]
+
+def tanimoto(common, count_a, count_b):
+    """Tanimoto from the popcount of the intersection and of both operands."""
+    common = common.astype(np.float32)
+    union = count_a.astype(np.float32) + count_b - common
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sim = common / union
+    sim[union == 0] = 0.0
+    return sim
+
+# ---------- index ----------
+class MaccsIndex:
+    """Memory-mapped MACCS fingerprint library."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.fps = np.load(prefix + ".fp.npy", mmap_mode="r")
+        self.counts = np.load(prefix + ".count.npy", mmap_mode="r")
+        self.offsets = np.load(prefix + ".offsets.npy", mmap_mode="r")
+
+    def __len__(self):
+        return self.fps.shape[0]
+
+    @staticmethod
+    def build(csv_path, prefix):
+        """Build an index from a cdxml2csv CSV file in two streaming passes."""
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f, delimiter=";")
+            next(reader, None)
+            n = sum(1 for _ in reader)
+
+        fps = np.lib.format.open_memmap(prefix + ".fp.npy", mode="w+",
+                                        dtype=np.uint64, shape=(n, N_WORDS))
+        counts = np.lib.format.open_memmap(prefix + ".count.npy", mode="w+",
+                                           dtype=np.uint8, shape=(n,))
+        offsets = np.lib.format.open_memmap(prefix + ".offsets.npy", mode="w+",
+                                            dtype=np.uint64, shape=(n,))
+
+        with open(csv_path, "r", encoding="utf-8", newline="") as f, \
+                open(prefix + ".names.txt", "wb") as names:
+            reader = csv.reader(f, delimiter=";")
+            header = next(reader, None) or []
+            col = header.index("maccs") if "maccs" in header else 2
+
+            row = 0
+            while row < n:
+                batch = [r for _, r in zip(range(CHUNK), reader)]
+                if not batch:
+                    break
+                packed = pack_bits([parse_bits(r[col]) for r in batch])
+                end = row + len(batch)
+                fps[row:end] = packed
+                counts[row:end] = popcount(packed)
+                for i, r in enumerate(batch):
+                    offsets[row + i] = names.tell()
+                    names.write(r[0].replace("\n", " ").encode("utf-8") + b"\n")
+                row = end
+
+        fps.flush()
+        counts.flush()
+        offsets.flush()
+        return n
+
+    def names(self, rows):
+        """Return the names of the given rows, reading only those lines."""
+        result = []
+        with open(self.prefix + ".names.txt", "rb") as f:
+            for row in rows:
+                f.seek(int(self.offsets[row]))
+                result.append(f.readline().rstrip(b"\n").decode("utf-8"))
+        return result
+
+    def find(self, name):
+        """Return the row of a molecule by name, or None."""
+        target = name.encode("utf-8")
+        with open(self.prefix + ".names.txt", "rb") as f:
+            for row, line in enumerate(f):
+                if line.rstrip(b"\n") == target:
+                    return row
+        return None
+
+    def similarity(self, query, block=1 << 20):
+        """Tanimoto similarity of one packed (3,) fingerprint against the whole library."""
+        query = np.asarray(query, dtype=np.uint64).reshape(N_WORDS)
+        query_count = popcount(query)
+        sims = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), block):
+            fps = self.fps[start:start + block]
+            common = popcount(fps & query)
+            sims[start:start + block] = tanimoto(common, self.counts[start:start + block], query_count)
+        return sims
+
+    def top_k(self, query, k=10):
+        """Return [(row, similarity)] of the k most similar molecules."""
+        sims = self.similarity(query)
+        k = min(k, len(sims))
+        if k <= 0:
+            return []
+        rows = np.argpartition(sims, len(sims) - k)[-k:]
+        rows = rows[np.argsort(-sims[rows], kind="stable")]
+        return [(int(r), float(sims[r])) for r in rows]
+
+    def above(self, query, threshold):
+        """Return [(row, similarity)] of all molecules with similarity >= threshold."""
+        sims = self.similarity(query)
+        rows = np.nonzero(sims >= threshold)[0]
+        rows = rows[np.argsort(-sims[rows], kind="stable")]
+        return [(int(r), float(sims[r])) for r in rows]
+
+    def iter_blocks(self, block=1024):
+        """
+        Yield (row_start, col_start, matrix) blocks of the all-vs-all similarity matrix.
+
+        Only blocks on or above the diagonal are produced; memory use is
+        bounded by block * block * 3 words regardless of the library size.
+        """
+        n = len(self)
+        for i in range(0, n, block):
+            fps_i = np.asarray(self.fps[i:i + block])
+            counts_i = np.asarray(self.counts[i:i + block])
+            for j in range(i, n, block):
+                fps_j = np.asarray(self.fps[j:j + block])
+                counts_j = np.asarray(self.counts[j:j + block])
+                common = popcount(fps_i[:, None, :] & fps_j[None, :, :])
+                yield i, j, tanimoto(common, counts_i[:, None], counts_j[None, :])
+
+    def pairs(self, threshold, block=1024):
+        """Yield (row_a, row_b, similarity) for all pairs a < b with similarity >= threshold."""
+        for i, j, sims in self.iter_blocks(block):
+            rows, cols = np.nonzero(sims >= threshold)
+            for r, c in zip(rows, cols):
+                a, b = i + int(r), j + int(c)
+                if a < b:
+                    yield a, b, float(sims[r, c])
+
+# ---------- command line ----------
+def query_fingerprint(index, args):
+    """Return the packed fingerprint selected by --name, --bits or --smiles."""
+    if args.name:
+        row = index.find(args.name)
+        if row is None:
+            print(f"Molecule not found in index: {args.name}")
+            sys.exit(1)
+        return np.asarray(index.fps[row])
+    if args.bits:
+        return pack_bits([parse_bits(args.bits)])[0]
+
+    # RDKit is only needed for SMILES queries
+    from rdkit import Chem
+    from rdkit.Chem import MACCSkeys
+    mol = Chem.MolFromSmiles(args.smiles)
+    if mol is None:
+        print(f"Invalid SMILES: {args.smiles}")
+        sys.exit(1)
+    bits = list(MACCSkeys.GenMACCSKeys(Chem.AddHs(mol)).GetOnBits())
+    return pack_bits([bits])[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="MACCS similarity search over cdxml2csv output.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="build an index from a cdxml2csv CSV file")
+    p_build.add_argument("csv")
+    p_build.add_argument("--index", help="index prefix (default: CSV name without .csv)")
+
+    p_query = sub.add_parser("query", help="find molecules similar to one query")
+    p_query.add_argument("index")
+    group = p_query.add_mutually_exclusive_group(required=True)
+    group.add_argument("--name", help="use a molecule from the index as the query")
+    group.add_argument("--bits", help='MACCS bit list, e.g. "[34, 76, 99]"')
+    group.add_argument("--smiles", help="compute the query fingerprint from SMILES")
+    p_query.add_argument("--top", type=int, default=10)
+    p_query.add_argument("--threshold", type=float,
+                         help="return every hit at or above this similarity instead of the top K")
+
+    p_pairs = sub.add_parser("pairs", help="all-vs-all pairs above a similarity threshold")
+    p_pairs.add_argument("index")
+    p_pairs.add_argument("--threshold", type=float, required=True)
+    p_pairs.add_argument("--block", type=int, default=1024)
+    p_pairs.add_argument("-o", "--output", help="CSV output (default: stdout)")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        prefix = args.index or os.path.splitext(args.csv)[0]
+        start = time.perf_counter()
+        n = MaccsIndex.build(args.csv, prefix)
+        print(f"Indexed {n} molecules into {prefix}.* in {time.perf_counter() - start:.2f} s")
+
+    elif args.command == "query":
+        index = MaccsIndex(args.index)
+        query = query_fingerprint(index, args)
+        start = time.perf_counter()
+        if args.threshold is not None:
+            hits = index.above(query, args.threshold)
+        else:
+            hits = index.top_k(query, args.top)
+        elapsed = (time.perf_counter() - start) * 1000
+        for name, (row, sim) in zip(index.names([r for r, _ in hits]), hits):
+            print(f"{sim:.3f}\t{name}")
+        print(f"{len(hits)} hits from {len(index)} molecules in {elapsed:.1f} ms")
+
+    elif args.command == "pairs":
+        index = MaccsIndex(args.index)
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        writer = csv.writer(out, delimiter=";")
+        writer.writerow(["name_a", "name_b", "tanimoto"])
+        # Names are read once per CHUNK pairs, for all their rows in one pass
+        # over the names file, instead of reopening it for every pair
+        pairs = index.pairs(args.threshold, args.block)
+        while True:
+            chunk = list(itertools.islice(pairs, CHUNK))
+            if not chunk:
+                break
+            rows = sorted({r for a, b, _ in chunk for r in (a, b)})
+            names = dict(zip(rows, index.names(rows)))
+            writer.writerows([names[a], names[b], f"{sim:.3f}"] for a, b, sim in chunk)
+        if args.output:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,242 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-
-# Read CSV
-df = pd.read_csv("C:/Users/BizovaV/ci2/A06/graph.csv")
-
-# Extract columns
-x = df["x"]
-y = df["y"]
-
-# Plot
-plt.plot(x, y)
-plt.xlabel("x")
-plt.ylabel("y")
-plt.title("y = x^2")
-plt.grid(True)
-
-# Save figure
-plt.savefig("C:/Users/BizovaV/ci2/A06/graph.png", dpi=300)
-plt.show()
+"""
+Plot y against x from a CSV file (or a memory-mapped .npy file) of any size.
+
+The file is read in chunks and reduced on the fly to the first, minimum,
+maximum and last point of every row bucket (M4 downsampling), with about as
+many buckets as the image is wide in pixels, so the line looks the same as
+with all points while matplotlib only sees a few thousand of them. The
+number of buckets is bounded: whenever it reaches twice the target,
+neighbouring buckets are merged. Memory use therefore depends on the chunk
+size, not on the file size. Rendering uses the headless Agg backend.
+
+Usage:
+    python graph.py [graph.csv] [-o graph.png] [--x x] [--y y] [--title "y = x^2"]
+    python graph.py big.csv -o big.png --chunksize 2000000 [--method lttb]
+    python graph.py big.csv --to-npy big.npy      # convert once, then:
+    python graph.py big.npy -o big.png            # memory-mapped, no parsing
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import numpy as np
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+CHUNK_ROWS = 1_000_000
+
+
+# ---------- input ----------
+def csv_chunks(path, xcol, ycol, chunksize=CHUNK_ROWS):
+    """Yield (x, y) float64 arrays from a CSV file, chunksize rows at a time."""
+    import pandas as pd
+
+    reader = pd.read_csv(path, usecols=[xcol, ycol], dtype=np.float64,
+                         chunksize=chunksize, encoding="utf-8-sig", engine="c")
+    for chunk in reader:
+        yield chunk[xcol].to_numpy(), chunk[ycol].to_numpy()
+
+def npy_chunks(path, chunksize=CHUNK_ROWS):
+    """Yield (x, y) from an (n, 2) float64 .npy file through a memory map."""
+    data = np.load(path, mmap_mode="r")
+    if data.ndim != 2 or data.shape[1] != 2:
+        raise ValueError(f"{path}: expected an (n, 2) array of x, y, got shape {data.shape}")
+    for start in range(0, len(data), chunksize):
+        block = np.asarray(data[start:start + chunksize], dtype=np.float64)
+        yield block[:, 0], block[:, 1]
+
+def csv_to_npy(path, out_path, xcol, ycol, chunksize=CHUNK_ROWS):
+    """Convert the x, y columns of a CSV file into an (n, 2) .npy file without loading it whole."""
+    def header(rows):
+        import io
+        buf = io.BytesIO()
+        np.lib.format.write_array_header_1_0(
+            buf, {"descr": "<f8", "fortran_order": False, "shape": (rows, 2)})
+        return buf.getvalue()
+
+    # The header is padded to 64 bytes, so the real row count fits in the
+    # space of the placeholder written first
+    placeholder = header(10 ** 15)
+    rows = 0
+    with open(out_path, "wb") as out:
+        out.write(placeholder)
+        for x, y in csv_chunks(path, xcol, ycol, chunksize):
+            out.write(np.column_stack((x, y)).astype("<f8").tobytes())
+            rows += len(x)
+        final = header(rows)
+        assert len(final) == len(placeholder)
+        out.seek(0)
+        out.write(final)
+    return rows
+
+
+# ---------- downsampling ----------
+class M4Reducer:
+    """
+    Streaming first/min/max/last downsampling of a line in row order.
+
+    Every bucket keeps four points (row, x, y); buckets have `size` rows and
+    are merged in pairs when there are 2 * target of them, doubling `size`.
+    """
+
+    def __init__(self, target=2000, size=1):
+        self.target = target
+        self.size = size
+        self.buckets = []                # arrays of shape (k, 4, 3): first, min, max, last
+        self.count = 0                   # buckets stored
+        self.pending = (np.empty(0), np.empty(0), np.empty(0))  # rows not yet in a bucket
+        self.rows = 0
+
+    def add(self, x, y):
+        keep = ~(np.isnan(x) | np.isnan(y))
+        idx = np.arange(self.rows, self.rows + len(x), dtype=np.float64)[keep]
+        self.rows += len(x)
+        idx, x, y = (np.concatenate((p, a)) for p, a in zip(self.pending, (idx, x[keep], y[keep])))
+
+        # Grow the buckets before reducing, so a chunk never makes more
+        # than 2 * target of them
+        while self.count + len(idx) // self.size >= 2 * self.target:
+            if self.count:
+                self.merge()
+            else:
+                self.size *= 2
+
+        full = len(idx) // self.size
+        if full:
+            n = full * self.size
+            self.store(self.reduce(idx[:n], x[:n], y[:n], self.size))
+        self.pending = (idx[full * self.size:], x[full * self.size:], y[full * self.size:])
+
+    def reduce(self, idx, x, y, size):
+        # (k * size) rows -> (k, 4, 3) bucket records
+        idx, x, y = (a.reshape(-1, size) for a in (idx, x, y))
+        rows = np.arange(len(idx))
+        picks = [np.zeros(len(idx), dtype=np.intp), y.argmin(axis=1),
+                 y.argmax(axis=1), np.full(len(idx), size - 1, dtype=np.intp)]
+        return np.stack([np.stack((idx[rows, p], x[rows, p], y[rows, p]), axis=1)
+                         for p in picks], axis=1)
+
+    def store(self, records):
+        self.buckets.append(records)
+        self.count += len(records)
+        while self.count >= 2 * self.target:
+            self.merge()
+
+    def merge(self):
+        # Pair neighbouring buckets; an odd last bucket is kept as it is
+        b = np.concatenate(self.buckets)
+        odd = b[-1:] if len(b) % 2 else b[:0]
+        a, c = b[0:len(b) - len(odd):2], b[1:len(b) - len(odd):2]
+        merged = np.empty_like(a)
+        merged[:, 0] = a[:, 0]
+        merged[:, 3] = c[:, 3]
+        lower = (a[:, 1, 2] <= c[:, 1, 2])[:, None]
+        merged[:, 1] = np.where(lower, a[:, 1], c[:, 1])
+        higher = (a[:, 2, 2] >= c[:, 2, 2])[:, None]
+        merged[:, 2] = np.where(higher, a[:, 2], c[:, 2])
+        self.buckets = [merged, odd]
+        self.count = len(merged) + len(odd)
+        self.size *= 2
+
+    def points(self):
+        """Return the reduced (x, y) in row order."""
+        idx, x, y = self.pending
+        if len(idx):
+            self.store(self.reduce(idx, x, y, len(idx)))
+            self.pending = (np.empty(0), np.empty(0), np.empty(0))
+        if not self.count:
+            return np.empty(0), np.empty(0)
+        pts = np.concatenate(self.buckets).reshape(-1, 3)
+        # Sort by row and drop points picked twice (e.g. first == min)
+        _, first = np.unique(pts[:, 0], return_index=True)
+        pts = pts[first]
+        return pts[:, 1], pts[:, 2]
+
+def lttb(x, y, n):
+    """Largest-Triangle-Three-Buckets: pick n of the points keeping the visual shape."""
+    if n >= len(x) or n < 3:
+        return x, y
+    edges = np.linspace(1, len(x) - 1, n - 1).astype(int)
+    keep = [0]
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else len(x)
+        ax, ay = x[keep[-1]], y[keep[-1]]
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        keep.append(lo + int(area.argmax()))
+    keep.append(len(x) - 1)
+    return x[keep], y[keep]
+
+
+# ---------- plot ----------
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def plot(x, y, out_path, xlabel, ylabel, title, dpi=300, show=False):
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")  # headless: no window, no blocking
+    # Rasterize long paths in pieces; a dense zigzag of a few thousand points
+    # otherwise costs Agg ~200 MB at 300 dpi
+    matplotlib.rcParams["agg.path.chunksize"] = 1000
+    import matplotlib.pyplot as plt
+
+    plt.plot(x, y)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.grid(True)
+
+    # Save figure
+    plt.savefig(out_path, dpi=dpi)
+    if show:
+        plt.show()
+    plt.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot y against x from a large CSV or .npy file.")
+    parser.add_argument("input", nargs="?", default=os.path.join(HERE, "graph.csv"),
+                        help="CSV file, or an (n, 2) .npy file of x, y (default: graph.csv)")
+    parser.add_argument("-o", "--output", help="PNG file (default: input name with .png)")
+    parser.add_argument("--x", default="x", help="x column (default: x)")
+    parser.add_argument("--y", default="y", help="y column (default: y)")
+    parser.add_argument("--title", help="plot title (default: 'y vs x')")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows read at a time")
+    parser.add_argument("--method", choices=("minmax", "lttb"), default="minmax",
+                        help="minmax keeps every extreme per pixel; lttb then thins to --points")
+    parser.add_argument("--points", type=int, help="points left by lttb (default: image width)")
+    parser.add_argument("--to-npy", metavar="NPY", help="convert the CSV to an (n, 2) .npy file and exit")
+    parser.add_argument("--show", action="store_true", help="also open a window (blocks)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.to_npy:
+        rows = csv_to_npy(args.input, args.to_npy, args.x, args.y, args.chunksize)
+        print(f"{rows} rows written to {args.to_npy} in {time.perf_counter() - start:.2f} s "
+              f"(peak memory {peak_rss_mb():.0f} MB)")
+        return
+
+    output = args.output or os.path.splitext(args.input)[0] + ".png"
+    width_px = int(6.4 * args.dpi)  # matplotlib's default figure width
+    reducer = M4Reducer(target=width_px)
+    if args.input.lower().endswith(".npy"):
+        chunks = npy_chunks(args.input, args.chunksize)
+    else:
+        chunks = csv_chunks(args.input, args.x, args.y, args.chunksize)
+    for x, y in chunks:
+        reducer.add(x, y)
+    x, y = reducer.points()
+    if args.method == "lttb":
+        x, y = lttb(x, y, args.points or width_px)
+    read_s = time.perf_counter() - start
+
+    plot(x, y, output, args.x, args.y, args.title or f"{args.y} vs {args.x}", args.dpi, args.show)
+    print(f"{reducer.rows} rows -> {len(x)} points ({args.method}); "
+          f"read {read_s:.2f} s, total {time.perf_counter() - start:.2f} s; "
+          f"peak memory {peak_rss_mb():.0f} MB; saved {output}")
+
+if __name__ == "__main__":
+    main()
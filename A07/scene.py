@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Scene composer and parallel renderer for multi-molecule POV-Ray scenes.
+
+compose: reads a .smi file, generates 3D structures in-process (common/mol3d.py)
+and lays out N copies of one molecule, or several different molecules, on a
+polygon (like etoh6.pov), a grid or a cubic lattice. The scene is written as a
+single .pov file that includes babel_povray3.inc, so nothing has to be edited
+by hand.
+
+render: renders a list of scenes in parallel (one POV-Ray process per job).
+With --tiles a scene is split into horizontal strips (+SR/+ER partial
+renders) that run on different cores and are stitched back into one PNG.
+
+Usage:
+    python scene.py compose etoh.smi -o etoh6.pov --layout polygon -n 6
+    python scene.py compose molecules.smi -o grid.pov --layout grid
+    python scene.py compose etoh.smi -o cube.pov --layout lattice -n 27
+    python scene.py render etoh6.pov grid.pov -W 1024 -H 768 -j 4
+    python scene.py render cube.pov -W 3840 -H 2160 --tiles 8
+"""
+import os
+import sys
+import math
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+from mol3d import conformer, read_smiles, write_pov
+
+LAYOUTS = ("polygon", "grid", "lattice")
+MARGIN = 1.5  # space between molecules (atom spheres have radius 0.6)
+
+
+# ---------- layouts: lists of (position, rotation) ----------
+def polygon(n, spacing):
+    # Vertices of a regular n-gon in the xy plane, each copy turned like in etoh6.pov
+    if n == 1:
+        return [((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))]
+    radius = spacing / (2 * math.sin(math.pi / n))  # neighbours spacing apart
+    slots = []
+    for i in range(n):
+        angle = i * 360.0 / n
+        slots.append(((radius * math.cos(math.radians(angle)),
+                       radius * math.sin(math.radians(angle)), 0.0), (0.0, 0.0, angle)))
+    return slots
+
+def grid(n, spacing):
+    # Rows of ceil(sqrt(n)) molecules in the xy plane, centered on the origin
+    cols = math.ceil(math.sqrt(n))
+    rows = math.ceil(n / cols)
+    slots = []
+    for i in range(n):
+        r, c = divmod(i, cols)
+        slots.append((((c - (cols - 1) / 2) * spacing, ((rows - 1) / 2 - r) * spacing, 0.0),
+                      (0.0, 0.0, 0.0)))
+    return slots
+
+def lattice(n, spacing):
+    # Simple cubic lattice of ceil(n^(1/3))^3 sites, filled in order
+    k = max(1, math.ceil(round(n ** (1 / 3), 9)))
+    slots = []
+    for i in range(n):
+        z, rest = divmod(i, k * k)
+        y, x = divmod(rest, k)
+        slots.append((((x - (k - 1) / 2) * spacing, ((k - 1) / 2 - y) * spacing,
+                       (z - (k - 1) / 2) * spacing), (0.0, 0.0, 0.0)))
+    return slots
+
+
+def extent(conf):
+    # Bounding box diagonal: the size of a conformer in any orientation
+    return math.sqrt(sum((max(c) - min(c)) ** 2 for c in zip(*conf.coords)))
+
+def fmt_vec(v):
+    return "<" + ",".join(f"{c:.4f}" for c in v) + ">"
+
+def compose(smiles, out_path, layout="polygon", n=None, spacing=None):
+    """Write a scene with n molecules (cycling through smiles) in the given layout."""
+    n = n or len(smiles)
+    unique = list(dict.fromkeys(smiles))
+    confs = [conformer(s) for s in unique]
+    spacing = spacing or max(extent(c) for c in confs) + MARGIN
+    slots = {"polygon": polygon, "grid": grid, "lattice": lattice}[layout](n, spacing)
+
+    # Camera far enough away to see every slot
+    reach = max(math.sqrt(sum(c * c for c in pos)) for pos, _ in slots) + spacing / 2
+    distance = max(10.0, 2.4 * reach)
+    if layout == "lattice":  # look at the cube from above and the side
+        camera = (0.5 * distance, 0.6 * distance, -distance)
+    else:
+        camera = (0.0, 0.0, -distance)
+
+    with open(out_path, "w", encoding="utf-8") as out:
+        w = out.write
+        w(f"// Generated by scene.py: {n} molecules, {layout} layout\n")
+        w(f"// {', '.join(unique)}\n\n")
+        w("#declare BAS = true;\n#declare TRANS = false;\n\n")
+        w('#include "colors.inc"\n#include "babel_povray3.inc"\n\n')
+        for k, conf in enumerate(confs):
+            w(f"// ---------- mol_{k}: {unique[k]} ----------\n")
+            write_pov(conf, out, name=f"mol_{k}", scene=False, place=False, include=False)
+
+        w("// Camera\ncamera {\n")
+        w(f"    location {fmt_vec(camera)}\n    look_at <0, 0, 0>\n")
+        w("    right x*image_width/image_height\n}\n\n")
+        w("// Lighting\nlight_source {\n")
+        w(f"    {fmt_vec((distance * 0.7, distance * 0.7, -distance * 0.7))}\n    color rgb 1\n}}\n\n")
+        w("background { color rgb <1,1,1> }\n\n")
+
+        w(f"// {layout} placement\n")
+        for i, (pos, rot) in enumerate(slots):
+            k = unique.index(smiles[i % len(smiles)])
+            w(f"object {{\n    mol_{k}\n    translate mol_{k}_center\n"
+              f"    rotate {fmt_vec(rot)}\n    translate {fmt_vec(pos)}\n}}\n")
+    return n
+
+
+# ---------- rendering ----------
+def tile_rows(height, tiles):
+    # 1-based inclusive row ranges of nearly equal height
+    tiles = max(1, min(tiles, height))
+    bounds = [round(i * height / tiles) for i in range(tiles + 1)]
+    return [(bounds[i] + 1, bounds[i + 1]) for i in range(tiles)]
+
+def povray(scene, png, width, height, antialias=True, rows=None):
+    cmd = ["povray", f"+I{scene}", f"+O{png}", f"+W{width}", f"+H{height}", "+FN",
+           f"+L{HERE}", f"+L{os.path.dirname(os.path.abspath(scene))}", "-D"]
+    if antialias:
+        cmd.append("+A")
+    if rows:
+        cmd += [f"+SR{rows[0]}", f"+ER{rows[1]}"]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+def stitch(tile_pngs, ranges, out_png, width, height):
+    """Paste the strips into one image and delete them."""
+    from PIL import Image  # only needed for tiled renders
+
+    image = Image.new("RGB", (width, height))
+    for png, (first, last) in zip(tile_pngs, ranges):
+        with Image.open(png) as tile:
+            if tile.height == height:  # full-size file with only the strip rendered
+                tile = tile.crop((0, first - 1, width, last))
+            image.paste(tile.convert("RGB"), (0, first - 1))
+    image.save(out_png)
+    for png in tile_pngs:
+        os.remove(png)
+
+def render_all(scenes, width, height, jobs=None, tiles=1, antialias=True):
+    """Render every scene to <scene>.png; tiles > 1 splits each scene into strips."""
+    jobs = jobs or os.cpu_count() or 1
+    tasks = []  # (scene, png, rows)
+    plans = {}
+    for scene in scenes:
+        png = os.path.splitext(scene)[0] + ".png"
+        if tiles > 1:
+            ranges = tile_rows(height, tiles)
+            parts = [f"{os.path.splitext(scene)[0]}.tile{i}.png" for i in range(len(ranges))]
+            tasks += [(scene, part, rows) for part, rows in zip(parts, ranges)]
+            plans[scene] = (png, parts, ranges)
+        else:
+            tasks.append((scene, png, None))
+            plans[scene] = (png, None, None)
+
+    start = time.perf_counter()
+    busy = {scene: 0.0 for scene in scenes}
+    failed = set()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [(scene, pool.submit(povray, scene, png, width, height, antialias, rows))
+                   for scene, png, rows in tasks]
+        for scene, future in futures:
+            try:
+                busy[scene] += future.result()
+            except (OSError, subprocess.CalledProcessError) as err:
+                stderr = getattr(err, "stderr", b"") or b""
+                print(f"{scene}: povray failed: {err} {stderr.decode(errors='replace')[-300:]}")
+                failed.add(scene)
+
+    for scene in scenes:
+        png, parts, ranges = plans[scene]
+        if scene in failed:
+            continue
+        if parts:
+            stitch(parts, ranges, png, width, height)
+        print(f"{scene} -> {png} ({busy[scene]:.2f} s of render time"
+              f"{f' in {len(parts)} tiles' if parts else ''})")
+    print(f"Rendered {len(scenes) - len(failed)} of {len(scenes)} scenes "
+          f"in {time.perf_counter() - start:.2f} s with {jobs} parallel POV-Ray processes")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compose and render multi-molecule POV-Ray scenes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    comp = sub.add_parser("compose", help="lay out molecules from a .smi file in one scene")
+    comp.add_argument("smi", help=".smi file, one molecule per line")
+    comp.add_argument("-o", "--output", required=True, help="scene .pov file")
+    comp.add_argument("--layout", choices=LAYOUTS, default="polygon")
+    comp.add_argument("-n", type=int, help="number of molecules (default: one per SMILES)")
+    comp.add_argument("--spacing", type=float, help="distance between molecules (default: from their size)")
+
+    rend = sub.add_parser("render", help="render scenes in parallel")
+    rend.add_argument("scenes", nargs="+")
+    rend.add_argument("-W", "--width", type=int, default=800)
+    rend.add_argument("-H", "--height", type=int, default=600)
+    rend.add_argument("-j", "--jobs", type=int, help="parallel POV-Ray processes (default: number of cores)")
+    rend.add_argument("--tiles", type=int, default=1, help="split each scene into this many strips")
+    rend.add_argument("--no-antialias", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "compose":
+        smiles = read_smiles(args.smi)
+        if not smiles:
+            print(f"No SMILES in {args.smi}")
+            sys.exit(1)
+        start = time.perf_counter()
+        n = compose(smiles, args.output, args.layout, args.n, args.spacing)
+        print(f"{n} molecules ({args.layout}) written to {args.output} "
+              f"in {time.perf_counter() - start:.3f} s")
+    else:
+        ok = render_all(args.scenes, args.width, args.height, args.jobs, args.tiles,
+                        not args.no_antialias)
+        sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
+import os
 import re
-from flask import Flask, render_template, request
-from chembl_webresource_client.new_client import new_client
+import sys
+from flask import Flask, render_template, request, jsonify
+
+# Shared cached ChEMBL lookup (../common/chembl_lookup.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from chembl_lookup import get_lookup
+import metrics
 
 app = Flask(__name__)
+# Stage timing, /metrics (Prometheus) and ?profile=1 -> Server-Timing header
+metrics.init_app(app)
+metrics.gauge("chembl_lookup_hit_rate", "Share of ChEMBL lookups answered from the caches.",
+              lambda: get_lookup().stats()["hit_rate"])
 
 # Filter to handle chemical subscripts in HTML
 @app.template_filter('subscript')
@@ -11,6 +21,40 @@ def subscript_filter(formula):
         return 'N/A'
     return re.sub(r'(\d+)', r'<sub>\1</sub>', str(formula))
 
+def describe(data, smiles):
+    """ChEMBL molecule record -> the fields shown on the page"""
+    props = data.get('molecule_properties') or {}
+    structs = data.get('molecule_structures') or {}
+
+    # Name and Synonyms logic
+    raw_name = data.get('pref_name')
+    name = raw_name.title() if raw_name else 'N/A'
+
+    synonyms_list = data.get('molecule_synonyms') or []
+    syn_names = [(s.get('synonyms') or s.get('molecule_synonym', '')).title() for s in synonyms_list if s]
+    synonyms_str = (', '.join(syn_names[:3]) + "...") if len(syn_names) > 3 else (', '.join(syn_names) if syn_names else 'N/A')
+
+    weight_raw = props.get('full_mwt')
+    weight = f"{float(weight_raw):.2f}" if weight_raw else 'N/A'
+
+    return {
+        'chembl_id': data.get('molecule_chembl_id'),
+        'name': name,
+        'synonyms': synonyms_str,
+        'formula': props.get('full_molformula', 'N/A'),
+        'weight': weight,
+        'type': str(data.get('molecule_type', 'N/A')).capitalize(),
+        'smiles': structs.get('canonical_smiles', smiles),
+        'inchi': structs.get('standard_inchi', 'N/A'),
+        'inchikey': structs.get('standard_inchi_key', 'N/A'),
+        'alogp': props.get('alogp', 'N/A'),
+        'hba': props.get('hba', 'N/A'),
+        'hbd': props.get('hbd', 'N/A'),
+        'psa': props.get('psa', 'N/A'),
+        'heavy_atoms': props.get('heavy_atoms', 'N/A'),
+        'ro5_violations': props.get('num_ro5_violations', 'N/A')
+    }
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     compound = None
@@ -22,48 +66,27 @@ def index():
             error = "Please enter a SMILES string."
         else:
             try:
-                molecule_client = new_client.molecule
-                res = molecule_client.filter(molecule_structures__canonical_smiles=smiles)
-                
-                if not res:
+                with metrics.span("chembl"):
+                    data = get_lookup().lookup(smiles)
+
+                if data is None:
                     error = "No compound found for this SMILES."
                 else:
-                    data = res[0]
-                    props = data.get('molecule_properties') or {}
-                    structs = data.get('molecule_structures') or {}
-
-                    # Name and Synonyms logic
-                    raw_name = data.get('pref_name')
-                    name = raw_name.title() if raw_name else 'N/A'
-                    
-                    synonyms_list = data.get('molecule_synonyms') or []
-                    syn_names = [(s.get('synonyms') or s.get('molecule_synonym', '')).title() for s in synonyms_list if s]
-                    synonyms_str = (', '.join(syn_names[:3]) + "...") if len(syn_names) > 3 else (', '.join(syn_names) if syn_names else 'N/A')
-
-                    weight_raw = props.get('full_mwt')
-                    weight = f"{float(weight_raw):.2f}" if weight_raw else 'N/A'
-
-                    compound = {
-                        'chembl_id': data.get('molecule_chembl_id'),
-                        'name': name,
-                        'synonyms': synonyms_str,
-                        'formula': props.get('full_molformula', 'N/A'),
-                        'weight': weight,
-                        'type': str(data.get('molecule_type', 'N/A')).capitalize(),
-                        'smiles': structs.get('canonical_smiles', smiles),
-                        'inchi': structs.get('standard_inchi', 'N/A'),
-                        'inchikey': structs.get('standard_inchi_key', 'N/A'),
-                        'alogp': props.get('alogp', 'N/A'),
-                        'hba': props.get('hba', 'N/A'),
-                        'hbd': props.get('hbd', 'N/A'),
-                        'psa': props.get('psa', 'N/A'),
-                        'heavy_atoms': props.get('heavy_atoms', 'N/A'),
-                        'ro5_violations': props.get('num_ro5_violations', 'N/A')
-                    }
+                    with metrics.span("describe"):
+                        compound = describe(data, smiles)
             except Exception as e:
-                error = f"Error: {str(e)}"
+                # Say where it failed: chembl or describe
+                stage = getattr(e, "stage", None)
+                app.logger.exception("lookup failed in stage %s", stage)
+                error = f"Error ({stage}): {str(e)}" if stage else f"Error: {str(e)}"
+
+    with metrics.span("template"):
+        return render_template("index.html", compound=compound, error=error)
 
-    return render_template("index.html", compound=compound, error=error)
+# Cache hit rate and lookup latency
+@app.route("/lookup_stats")
+def lookup_stats():
+    return jsonify(get_lookup().stats())
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -1,10 +1,19 @@
 import os
-import subprocess
+import sys
 import re
-from flask import Flask, render_template, request, jsonify
-from chembl_webresource_client.new_client import new_client
+import json
+from urllib.parse import quote
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+
+# Shared cached ChEMBL lookup (../common/chembl_lookup.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from chembl_lookup import get_lookup
+import metrics
+from render import RenderCache, RenderQueue, QueueFull, PRESETS, depict_svg, mol3d
 
 app = Flask(__name__)
+# Stage timing, /metrics (Prometheus) and ?profile=1 -> Server-Timing header
+metrics.init_app(app)
 
 # Setup paths
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -13,6 +22,82 @@ STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
 if not os.path.exists(STATIC_FOLDER):
     os.makedirs(STATIC_FOLDER)
 
+# Rendered images, one file per molecule and render settings (static/renders),
+# produced by background jobs so requests do not wait for POV-Ray
+render_cache = RenderCache()
+render_queue = RenderQueue(render_cache)
+# Fast low-resolution previews get their own worker, so they never wait
+# behind full-quality renders
+preview_queue = RenderQueue(render_cache, workers=1)
+
+MAX_BATCH = 1000  # SMILES per /process_batch request
+
+QUEUES = {"render": render_queue, "preview": preview_queue}
+metrics.gauge("render_queue_depth", "Render jobs waiting for a worker.",
+              lambda: {n: q.stats()["queue_depth"] for n, q in QUEUES.items()}, "queue")
+metrics.gauge("render_running", "Render jobs being rendered.",
+              lambda: {n: q.stats()["running"] for n, q in QUEUES.items()}, "queue")
+metrics.gauge("render_workers", "Render worker threads.",
+              lambda: {n: q.workers for n, q in QUEUES.items()}, "queue")
+metrics.gauge("render_cache_bytes", "Size of the rendered images in static/renders.",
+              lambda: render_cache.stats()["bytes"])
+metrics.gauge("chembl_lookup_hit_rate", "Share of ChEMBL lookups answered from the caches.",
+              lambda: get_lookup().stats()["hit_rate"])
+
+def submit_render(queue, smiles, quality):
+    try:
+        return queue.submit(smiles, PRESETS[quality]).as_dict()
+    except QueueFull as e:
+        return {"job_id": None, "status": "rejected", "image_url": None, "error": str(e)}
+
+def describe(data, smiles):
+    """ChEMBL molecule record -> the fields shown on the page"""
+    props = data.get('molecule_properties') or {}
+    structs = data.get('molecule_structures') or {}
+
+    # Name and Synonyms logic from your previous version
+    raw_name = data.get('pref_name')
+    name = raw_name.title() if raw_name else 'N/A'
+
+    synonyms_list = data.get('molecule_synonyms') or []
+    syn_names = [(s.get('synonyms') or s.get('molecule_synonym', '')).title() for s in synonyms_list if s]
+    synonyms_str = (', '.join(syn_names[:3]) + "...") if len(syn_names) > 3 else (', '.join(syn_names) if syn_names else 'N/A')
+
+    return {
+        'name': name,
+        'chembl_id': data.get('molecule_chembl_id'),
+        'synonyms': synonyms_str,
+        'formula': props.get('full_molformula', 'N/A'),
+        'weight': f"{float(props.get('full_mwt')):.2f}" if props.get('full_mwt') else 'N/A',
+        'type': str(data.get('molecule_type', 'N/A')).capitalize(),
+        'smiles': structs.get('canonical_smiles', smiles),
+        'inchi': structs.get('standard_inchi', 'N/A'),
+        'inchikey': structs.get('standard_inchi_key', 'N/A'),
+        'alogp': props.get('alogp', 'N/A'),
+        'hba': props.get('hba', 'N/A'),
+        'hbd': props.get('hbd', 'N/A'),
+        'psa': props.get('psa', 'N/A'),
+        'heavy_atoms': props.get('heavy_atoms', 'N/A'),
+        'ro5_violations': props.get('num_ro5_violations', 'N/A'),
+    }
+
+def process_many(smiles_list, lookup=None):
+    """Yield one result dict per SMILES (with its index in smiles_list) as lookups finish."""
+    lookup = lookup or get_lookup()
+    for index, smiles, data, error in lookup.lookup_many(smiles_list):
+        item = {'index': index, 'query': smiles}
+        if error:
+            item['error'] = error
+        elif data is None:
+            item['error'] = "No compound found for this SMILES."
+        else:
+            try:
+                with metrics.span("describe"):
+                    item.update(describe(data, smiles))
+            except Exception as e:
+                item['error'] = str(e)
+        yield item
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -22,59 +107,106 @@ def process():
     data_in = request.get_json()
     smiles = data_in.get("smiles", "").strip()
     
+    quality = data_in.get("quality", "standard")
+
     if not smiles:
         return jsonify({"error": "Please enter a SMILES string."}), 400
+    if quality not in PRESETS:
+        return jsonify({"error": f"Unknown quality '{quality}', use one of: {', '.join(PRESETS)}."}), 400
 
     try:
-        molecule_client = new_client.molecule
-        res = molecule_client.filter(molecule_structures__canonical_smiles=smiles)
-        
-        if not res:
+        with metrics.span("chembl"):
+            data = get_lookup().lookup(smiles)
+
+        if data is None:
             return jsonify({"error": "No compound found for this SMILES."}), 404
-        
-        data = res[0]
-        props = data.get('molecule_properties') or {}
-        structs = data.get('molecule_structures') or {}
-
-        # Name and Synonyms logic from your previous version
-        raw_name = data.get('pref_name')
-        name = raw_name.title() if raw_name else 'N/A'
-        
-        synonyms_list = data.get('molecule_synonyms') or []
-        syn_names = [(s.get('synonyms') or s.get('molecule_synonym', '')).title() for s in synonyms_list if s]
-        synonyms_str = (', '.join(syn_names[:3]) + "...") if len(syn_names) > 3 else (', '.join(syn_names) if syn_names else 'N/A')
-
-        # 3D Rendering Logic
-        pov_path = os.path.join(STATIC_FOLDER, "mol.pov")
-        png_path = os.path.join(STATIC_FOLDER, "mol.png")
-        
-        # Step A: obabel
-        subprocess.run(["obabel", f"-:{smiles}", "-O", pov_path, "--gen3d"], check=True)
-        # Step B: povray (+L allows finding the .inc file in static)
-        subprocess.run(["povray", f"+I{pov_path}", f"+O{png_path}", "+W600", "+H400", "+A", f"+L{STATIC_FOLDER}", "-D"], check=True)
+
+        with metrics.span("describe"):
+            fields = describe(data, smiles)
+
+        # 3D Rendering Logic: mol3d (RDKit) .pov + povray in background jobs, cached by
+        # canonical SMILES; obabel only without RDKit.
+        # Progressive: RDKit 2D depiction at once, then a fast preview render,
+        # then the requested quality.
+        with metrics.span("render_submit"):
+            job = submit_render(render_queue, smiles, quality)
+            preview = None
+            if quality != "preview" and job['status'] != "done":
+                preview = submit_render(preview_queue, smiles, "preview")
+        with metrics.span("depict"):
+            depiction_url = f"/depict.svg?smiles={quote(smiles)}" if depict_svg(smiles) else None
 
         # Prepare full data packet
-        return jsonify({
-            'name': name,
-            'chembl_id': data.get('molecule_chembl_id'),
-            'synonyms': synonyms_str,
-            'formula': props.get('full_molformula', 'N/A'),
-            'weight': f"{float(props.get('full_mwt')):.2f}" if props.get('full_mwt') else 'N/A',
-            'type': str(data.get('molecule_type', 'N/A')).capitalize(),
-            'smiles': structs.get('canonical_smiles', smiles),
-            'inchi': structs.get('standard_inchi', 'N/A'),
-            'inchikey': structs.get('standard_inchi_key', 'N/A'),
-            'alogp': props.get('alogp', 'N/A'),
-            'hba': props.get('hba', 'N/A'),
-            'hbd': props.get('hbd', 'N/A'),
-            'psa': props.get('psa', 'N/A'),
-            'heavy_atoms': props.get('heavy_atoms', 'N/A'),
-            'ro5_violations': props.get('num_ro5_violations', 'N/A'),
-            'image_url': '/static/mol.png'
-        })
+        with metrics.span("json"):
+            return jsonify({
+                **fields,
+                'image_url': job['image_url'],
+                'render_job': job['job_id'],
+                'render_status': job['status'],
+                'render_error': job['error'],
+                'quality': quality,
+                'preview_job': preview['job_id'] if preview else None,
+                'preview_image_url': preview['image_url'] if preview else None,
+                'depiction_url': depiction_url
+            })
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        # stage: where it failed (chembl, describe, render_submit, depict, json)
+        stage = getattr(e, "stage", None)
+        app.logger.exception("/process failed in stage %s", stage)
+        return jsonify({"error": str(e), "stage": stage, "type": type(e).__name__}), 500
+
+# Many SMILES at once, without 3D renders: {"smiles": ["CCO", "c1ccccc1", ...]}
+# (or one string with a SMILES per line). The answer is streamed as NDJSON,
+# one JSON object per line in the order the lookups finish; "index" is the
+# position of the SMILES in the request and failed items carry "error".
+@app.route("/process_batch", methods=["POST"])
+def process_batch():
+    data_in = request.get_json(silent=True)
+    if data_in is None and request.is_json:
+        return jsonify({"error": "Malformed JSON body."}), 400
+    if data_in is None:
+        smiles_list = [l for l in request.get_data(as_text=True).splitlines() if l.strip()]
+    else:
+        smiles_list = data_in.get("smiles", []) if isinstance(data_in, dict) else data_in
+        if isinstance(smiles_list, str):
+            smiles_list = [l for l in smiles_list.splitlines() if l.strip()]
+    if not isinstance(smiles_list, list) or not all(isinstance(s, str) for s in smiles_list):
+        return jsonify({"error": "Send a list of SMILES strings."}), 400
+    if not any(s.strip() for s in smiles_list):
+        return jsonify({"error": "Please enter at least one SMILES string."}), 400
+    if len(smiles_list) > MAX_BATCH:
+        return jsonify({"error": f"At most {MAX_BATCH} SMILES per request."}), 400
+
+    lines = (json.dumps(item) + "\n" for item in process_many(smiles_list))
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+# Cache hit rate and lookup latency
+@app.route("/lookup_stats")
+def lookup_stats():
+    return jsonify(get_lookup().stats())
+
+# RDKit 2D depiction, shown until the first 3D render is ready
+@app.route("/depict.svg")
+def depict():
+    svg = depict_svg(request.args.get("smiles", "").strip())
+    if svg is None:
+        return jsonify({"error": "Cannot depict this SMILES."}), 404
+    return Response(svg, mimetype="image/svg+xml")
+
+# Status of a background render; image_url is set once status is "done"
+@app.route("/render/<job_id>")
+def render_status(job_id):
+    job = render_queue.get(job_id) or preview_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown render job."}), 404
+    return jsonify(job.as_dict())
+
+@app.route("/render_stats")
+def render_stats():
+    return jsonify({"cache": render_cache.stats(), "queue": render_queue.stats(),
+                    "preview_queue": preview_queue.stats(),
+                    "conformers": mol3d.cache.stats() if mol3d else None})
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,340 @@
+"""
+3D rendering of molecules for app.py (RDKit + POV-Ray) with a render cache.
+
+The 3D coordinates and the .pov file come from common/mol3d.py in this
+process (conformers cached by canonical SMILES); Open Babel is only used
+when RDKit is not installed.
+
+Renders are stored as content-addressed files static/renders/<key>.png, where
+key is a hash of the canonical SMILES and the render settings, so every
+molecule gets its own stable image URL and repeated requests are served
+from disk without ray tracing. Each render works in its own temporary
+directory, so concurrent requests never overwrite each other's files.
+
+RenderQueue runs renders as background jobs in a bounded worker pool, so
+request threads return at once and the page polls /render/<job_id>.
+
+Quality presets (preview, standard, publication) select size and
+antialiasing; depict_svg() gives an instant RDKit 2D picture to show
+until the first render is ready.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import uuid
+import threading
+import subprocess
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from chembl_lookup import canonical_smiles  # common/ is put on sys.path by app.py
+from metrics import span, observe
+try:
+    import mol3d
+except ImportError:  # no RDKit: fall back to obabel --gen3d
+    mol3d = None
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+RENDER_FOLDER = os.path.join(STATIC_FOLDER, 'renders')
+MAX_CACHE_BYTES = 200 * 1024 * 1024  # LRU eviction above this size
+RENDER_TIMEOUT = 120                 # seconds per obabel/povray call
+MAX_QUEUED = 32                      # jobs waiting for a worker before new ones are refused
+KEEP_JOBS = 1000                     # finished jobs remembered for /render/<job_id>
+
+# antialias: False, True (POV-Ray default threshold) or a threshold (lower is finer)
+PRESETS = {
+    "preview": {"width": 300, "height": 200, "antialias": False},
+    "standard": {"width": 600, "height": 400, "antialias": True},
+    "publication": {"width": 1800, "height": 1200, "antialias": 0.1},
+}
+DEFAULT_SETTINGS = PRESETS["standard"]
+
+
+def render_key(smiles, settings):
+    """Cache key: hash of the canonical SMILES and the render settings."""
+    text = canonical_smiles(smiles) + "\n" + json.dumps(settings, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def run_pipeline(smiles, png_path, settings, workdir):
+    """RDKit conformer (or obabel --gen3d) -> .pov -> povray -> png_path"""
+    pov_path = os.path.join(workdir, "mol.pov")
+    timeout = settings.get("timeout", RENDER_TIMEOUT)
+    if mol3d is not None:
+        with span("mol3d"):
+            mol3d.write_pov_file(smiles, pov_path)
+    else:
+        with span("obabel"):
+            subprocess.run(["obabel", f"-:{smiles}", "-O", pov_path, "--gen3d"],
+                           check=True, capture_output=True, timeout=timeout)
+    # +L lets povray find babel_povray3.inc in static
+    cmd = ["povray", f"+I{pov_path}", f"+O{png_path}",
+           f"+W{settings['width']}", f"+H{settings['height']}", f"+L{STATIC_FOLDER}", "-D"]
+    antialias = settings.get("antialias")
+    if antialias is True:
+        cmd.append("+A")
+    elif antialias:
+        cmd += [f"+A{antialias}", "+AM2", "+R3"]  # adaptive supersampling, depth 3
+    with span("povray"):
+        subprocess.run(cmd, check=True, capture_output=True, cwd=workdir, timeout=timeout)
+
+
+@lru_cache(maxsize=512)
+def depict_svg(smiles, width=300, height=200):
+    """RDKit 2D depiction as SVG text, or None if RDKit is missing or smiles is invalid."""
+    try:
+        from rdkit import Chem
+        from rdkit.Chem.Draw import rdMolDraw2D
+    except ImportError:
+        return None
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    drawer = rdMolDraw2D.MolDraw2DSVG(width, height)
+    drawer.drawOptions().clearBackground = False
+    rdMolDraw2D.PrepareAndDrawMolecule(drawer, mol)
+    drawer.FinishDrawing()
+    return drawer.GetDrawingText()
+
+
+class RenderCache:
+    """Size-bounded LRU cache of rendered PNGs with one render per key at a time."""
+
+    def __init__(self, folder=RENDER_FOLDER, max_bytes=MAX_CACHE_BYTES, pipeline=run_pipeline):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.pipeline = pipeline
+        os.makedirs(folder, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.in_flight = {}          # key -> threading.Event of the running render
+        self.files = OrderedDict()   # key -> size, least recently used first
+        self.total_bytes = 0
+        self.hits = self.misses = self.waits = self.evictions = self.renders = 0
+        self.render_seconds = 0.0
+
+        # Pick up renders from earlier runs, oldest first
+        entries = []
+        for name in os.listdir(folder):
+            if name.endswith(".png"):
+                st = os.stat(os.path.join(folder, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self.files[key] = size
+            self.total_bytes += size
+
+    def path(self, key):
+        return os.path.join(self.folder, key + ".png")
+
+    def url(self, key):
+        return f"/static/renders/{key}.png"
+
+    def cached_url(self, smiles, settings=None):
+        """Return the image URL if smiles is already rendered, else None."""
+        key = render_key(smiles, dict(DEFAULT_SETTINGS, **(settings or {})))
+        with self.lock:
+            if key in self.files and os.path.exists(self.path(key)):
+                self.files.move_to_end(key)
+                self.hits += 1
+                return self.url(key)
+        return None
+
+    def get(self, smiles, settings=None):
+        """Return the image URL for smiles, rendering it first if it is not cached."""
+        settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        key = render_key(smiles, settings)
+
+        while True:
+            with self.lock:
+                if key in self.files and os.path.exists(self.path(key)):
+                    self.files.move_to_end(key)
+                    self.hits += 1
+                    return self.url(key)
+                event = self.in_flight.get(key)
+                if event is None:
+                    # This request renders; others asking for key wait for it
+                    event = self.in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            event.wait()
+            with self.lock:
+                if key not in self.files:  # the render failed, try ourselves
+                    continue
+                self.files.move_to_end(key)
+                return self.url(key)
+
+        try:
+            self.render(key, canonical_smiles(smiles), settings)
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            event.set()
+        return self.url(key)
+
+    def render(self, key, smiles, settings):
+        start = time.perf_counter()
+        workdir = tempfile.mkdtemp(prefix="render_", dir=self.folder)
+        try:
+            tmp_png = os.path.join(workdir, "mol.png")
+            self.pipeline(smiles, tmp_png, settings, workdir)
+            os.replace(tmp_png, self.path(key))  # atomic: never a half-written image
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        size = os.path.getsize(self.path(key))
+        with self.lock:
+            self.files[key] = size
+            self.total_bytes += size
+            self.renders += 1
+            self.render_seconds += time.perf_counter() - start
+            self.evict()
+
+    def evict(self):
+        # Called with self.lock held; never removes renders still being waited for
+        while self.total_bytes > self.max_bytes and len(self.files) > 1:
+            key, size = self.files.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.files),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "evictions": self.evictions,
+                "renders": self.renders,
+                "mean_render_s": round(self.render_seconds / self.renders, 3) if self.renders else 0.0,
+            }
+
+
+class QueueFull(Exception):
+    """Too many render jobs are waiting."""
+
+
+class RenderJob:
+    def __init__(self, smiles, settings):
+        self.id = uuid.uuid4().hex
+        self.smiles = smiles
+        self.settings = settings
+        self.status = "queued"  # queued -> running -> done | failed | timeout
+        self.image_url = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = self.finished = None
+
+    def as_dict(self):
+        now = time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "image_url": self.image_url,
+            "error": self.error,
+            "wait_s": round((self.started or now) - self.submitted, 3),
+            "render_s": round((self.finished or now) - self.started, 3) if self.started else None,
+        }
+
+
+class RenderQueue:
+    """Background render jobs in a bounded pool of worker threads (one per core)."""
+
+    def __init__(self, cache, workers=None, max_queued=MAX_QUEUED):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued
+        # Threads are enough: povray (and obabel) run as separate processes, and
+        # RDKit releases the GIL while it embeds and MMFF-optimizes a molecule;
+        # writing the .pov text (short) holds it. Embeddings are cached per molecule.
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()  # job_id -> RenderJob, oldest first
+        self.active = {}           # render key -> job queued or running
+        self.queued = self.running = 0
+        self.completed = self.failed = self.timeouts = self.rejected = 0
+        self.wait_seconds = self.render_seconds = 0.0
+
+    def submit(self, smiles, settings=None):
+        """Return a job for smiles; it is finished at once if the image is cached."""
+        settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        url = self.cache.cached_url(smiles, settings)
+        key = render_key(smiles, settings)
+        with self.lock:
+            if url is None and key in self.active:
+                return self.active[key]  # same molecule already on its way
+            job = RenderJob(smiles, settings)
+            if url is not None:
+                job.status, job.image_url = "done", url
+                job.started = job.finished = job.submitted
+            elif self.queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"Render queue is full ({self.queued} jobs waiting)")
+            else:
+                self.active[key] = job
+                self.queued += 1
+            self.jobs[job.id] = job
+            while len(self.jobs) > KEEP_JOBS:
+                self.jobs.popitem(last=False)
+        if job.status == "queued":
+            self.pool.submit(self.run, job, key)
+        return job
+
+    def run(self, job, key):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+            job.status, job.started = "running", time.time()
+            self.wait_seconds += job.started - job.submitted
+        observe("render_wait", job.started - job.submitted)
+        try:
+            job.image_url = self.cache.get(job.smiles, job.settings)
+            status = "done"
+        except subprocess.TimeoutExpired as err:
+            status, job.error = "timeout", f"{err.cmd[0]} timed out after {err.timeout} s"
+        except subprocess.CalledProcessError as err:
+            status, job.error = "failed", f"{err.cmd[0]} failed with exit code {err.returncode}"
+        except Exception as err:
+            status, job.error = "failed", str(err)
+        with self.lock:
+            job.status, job.finished = status, time.time()
+            self.running -= 1
+            self.active.pop(key, None)
+            self.render_seconds += job.finished - job.started
+            if status == "done":
+                self.completed += 1
+            elif status == "timeout":
+                self.timeouts += 1
+            else:
+                self.failed += 1
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            finished = self.completed + self.failed + self.timeouts
+            started = finished + self.running
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queued,
+                "max_queued": self.max_queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "mean_wait_s": round(self.wait_seconds / started, 3) if started else 0.0,
+                "mean_job_s": round(self.render_seconds / finished, 3) if finished else 0.0,
+            }
@@ -0,0 +1,146 @@
+"""
+Tests for the /process_batch endpoint with a local fake ChEMBL client.
+
+Run from the repository root (no network needed):
+    python -m pytest -q A09
+"""
+import os
+import sys
+import json
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+import chembl_lookup
+from chembl_lookup import ChemblLookup, canonical_smiles
+import app as a09
+
+
+RECORDS = {
+    "CCO": {"molecule_chembl_id": "CHEMBL545", "pref_name": "ETHANOL",
+            "molecule_properties": {"full_mwt": "46.07", "full_molformula": "C2H6O"},
+            "molecule_structures": {"canonical_smiles": "CCO"}},
+    "c1ccccc1": {"molecule_chembl_id": "CHEMBL277500", "pref_name": "BENZENE",
+                 "molecule_structures": {"canonical_smiles": "c1ccccc1"}},
+}
+
+
+class FakeClient:
+    """Stand-in for new_client.molecule; SMILES in `failing` raise like a network error."""
+
+    def __init__(self, failing=()):
+        self.records = {canonical_smiles(s): r for s, r in RECORDS.items()}
+        self.failing = set(failing)
+        self.calls = []
+
+    def filter(self, molecule_structures__canonical_smiles):
+        smiles = molecule_structures__canonical_smiles
+        self.calls.append(smiles)
+        if smiles in self.failing:
+            raise ConnectionError("ChEMBL unreachable")
+        record = self.records.get(canonical_smiles(smiles))
+        return [record] if record is not None else []
+
+
+@pytest.fixture
+def client():
+    return FakeClient(failing={"CCCl"})
+
+@pytest.fixture
+def http(client, monkeypatch):
+    # get_lookup() in the app returns this lookup: no disk cache, no network
+    monkeypatch.setattr(chembl_lookup, "_default", ChemblLookup(client=client, cache_path=None))
+    a09.app.config["TESTING"] = True
+    return a09.app.test_client()
+
+def post_batch(http, **kwargs):
+    response = http.post("/process_batch", **kwargs)
+    response.streamed = response.is_streamed  # get_data() buffers the body
+    items = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return response, items
+
+def by_index(items):
+    return {item["index"]: item for item in items}
+
+
+def test_streams_one_ndjson_line_per_input(http):
+    smiles = ["CCO", "c1ccccc1", "CCO"]
+    response, items = post_batch(http, json={"smiles": smiles})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.streamed
+    assert sorted(item["index"] for item in items) == [0, 1, 2]
+    results = by_index(items)
+    assert results[0]["chembl_id"] == "CHEMBL545"
+    assert results[0]["weight"] == "46.07"
+    assert results[1]["chembl_id"] == "CHEMBL277500"
+    assert all(results[i]["query"] == s for i, s in enumerate(smiles))
+
+def test_list_body_and_text_body(http):
+    _, items = post_batch(http, json=["CCO", "c1ccccc1"])
+    assert len(items) == 2
+    _, items = post_batch(http, data="CCO\n\nc1ccccc1\n", content_type="text/plain")
+    assert [i["chembl_id"] for i in sorted(items, key=lambda i: i["index"])] == \
+        ["CHEMBL545", "CHEMBL277500"]
+
+def test_duplicates_and_equivalent_smiles_are_looked_up_once(http, client):
+    _, items = post_batch(http, json={"smiles": ["CCO", "OCC", "C(O)C", "CCO"]})
+    assert len(items) == 4
+    assert {item["chembl_id"] for item in items} == {"CHEMBL545"}
+    assert len(client.calls) == 1
+
+def test_per_item_errors_keep_the_rest_of_the_batch(http):
+    smiles = ["CCO", "not a smiles", "CCCl", "c1ccccc1", ""]
+    response, items = post_batch(http, json={"smiles": smiles})
+    assert response.status_code == 200
+    results = by_index(items)
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    assert results[0]["chembl_id"] == "CHEMBL545"
+    assert results[3]["chembl_id"] == "CHEMBL277500"
+    assert results[1]["error"] == "No compound found for this SMILES."
+    assert results[2]["error"] == "ChEMBL unreachable"  # the client raised
+    assert results[4]["error"] == "Empty SMILES."
+    assert all("chembl_id" not in results[i] for i in (1, 2, 4))
+
+@pytest.mark.parametrize("kwargs", [
+    {"json": {"smiles": []}},
+    {"json": []},
+    {"json": {"smiles": ["", "  "]}},
+    {"data": "", "content_type": "text/plain"},
+])
+def test_empty_body(http, client, kwargs):
+    response = http.post("/process_batch", **kwargs)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert client.calls == []
+
+def test_broken_json(http, client):
+    response = http.post("/process_batch", data="{not json", content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Malformed JSON body."
+    assert client.calls == []
+
+@pytest.mark.parametrize("body", [
+    {"smiles": [1, 2]},
+    {"smiles": {"a": "CCO"}},
+    ["CCO", None],
+    42,
+])
+def test_malformed_body(http, client, body):
+    response = http.post("/process_batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Send a list of SMILES strings."
+    assert client.calls == []
+
+def test_max_batch(http, client):
+    response = http.post("/process_batch", json={"smiles": ["CCO"] * (a09.MAX_BATCH + 1)})
+    assert response.status_code == 400
+    assert str(a09.MAX_BATCH) in response.get_json()["error"]
+    assert client.calls == []
+
+    response, items = post_batch(http, json={"smiles": ["CCO"] * a09.MAX_BATCH})
+    assert response.status_code == 200
+    assert len(items) == a09.MAX_BATCH
+    assert len(client.calls) == 1
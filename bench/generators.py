@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Synthetic inputs for the benchmark suite, scaled up from the bundled fixtures.
+
+Every generator is deterministic (fixed seeds, fixed copy counts), writes
+into a directory of its own under the data directory and is skipped when
+that directory is already complete, so repeated runs reuse the files and
+their results stay comparable.
+
+    text     A02/test.txt repeated to the given size in MB
+    nist     pages of A03/nist_benzidine.html replicated `copies` times each
+    world    A04 country/city/countrylanguage CSVs with every country copied `scale` times
+    cdxml    copies of the nine A05/rx*.cdxml files
+    graph    A06/graph.csv-like x,y CSV (y = x^2 plus noise) with `rows` rows
+    smiles   distinct SMILES (linear and branched alkanes, alcohols, amines) for the Flask apps
+
+Usage:
+    python generators.py DATA_DIR [--size small|large]
+"""
+import os
+import sys
+import glob
+import shutil
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "A03"))
+sys.path.insert(0, os.path.join(ROOT, "A04"))
+
+DONE = ".complete"  # written last, so a half-generated directory is rebuilt
+
+
+def target(data_dir, name, **params):
+    """Return (path, ready): the directory for one generated data set and whether it exists."""
+    label = "_".join(f"{k}{v}" for k, v in sorted(params.items()))
+    path = os.path.join(data_dir, f"{name}_{label}")
+    if os.path.exists(os.path.join(path, DONE)):
+        return path, True
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path, False
+
+def finish(path):
+    open(os.path.join(path, DONE), "w").close()
+
+
+# ---------- generators ----------
+def text(data_dir, mb):
+    """A02/test.txt repeated to about mb megabytes; returns the file path."""
+    path, ready = target(data_dir, "text", mb=mb)
+    out_path = os.path.join(path, "test_big.txt")
+    if not ready:
+        with open(os.path.join(ROOT, "A02", "test.txt"), "rb") as f:
+            page = f.read()
+        if not page.endswith(b"\n"):
+            page += b"\n"
+        block = page * max(1, (1 << 20) // len(page))  # ~1 MB per write
+        with open(out_path, "wb") as out:
+            written = 0
+            while written < mb * 1e6:
+                out.write(block)
+                written += len(block)
+        finish(path)
+    return out_path
+
+def nist(data_dir, pages, copies):
+    """`pages` HTML files, each nist_benzidine.html replicated `copies` times; returns their paths."""
+    from bench_parser import make_replicated
+
+    path, ready = target(data_dir, "nist", pages=pages, copies=copies)
+    paths = [os.path.join(path, f"page{i:05d}.html") for i in range(pages)]
+    if not ready:
+        make_replicated(copies, paths[0])
+        for p in paths[1:]:
+            shutil.copyfile(paths[0], p)
+        finish(path)
+    return paths
+
+def world(data_dir, scale):
+    """country.csv, city.csv and countrylanguage.csv with every country copied `scale` times."""
+    from bench_queries import write_scaled
+
+    path, ready = target(data_dir, "world", scale=scale)
+    names = ("country.csv", "city.csv", "countrylanguage.csv")
+    if not ready:
+        write_scaled(path, scale)
+        finish(path)
+    return [os.path.join(path, n) for n in names]
+
+def cdxml(data_dir, files):
+    """`files` CDXML files, cycling through the nine rx*.cdxml fixtures; returns their paths."""
+    sources = sorted(glob.glob(os.path.join(ROOT, "A05", "rx*.cdxml")))
+    path, ready = target(data_dir, "cdxml", files=files)
+    paths = [os.path.join(path, f"{i:06d}_{os.path.basename(sources[i % len(sources)])}")
+             for i in range(files)]
+    if not ready:
+        for i, p in enumerate(paths):
+            shutil.copyfile(sources[i % len(sources)], p)
+        finish(path)
+    return paths
+
+def graph(data_dir, rows, chunk=1_000_000):
+    """x,y CSV like A06/graph.csv (UTF-8 with BOM) with `rows` noisy points of y = x^2."""
+    import numpy as np
+
+    path, ready = target(data_dir, "graph", rows=rows)
+    out_path = os.path.join(path, "graph_big.csv")
+    if not ready:
+        rng = np.random.default_rng(1234)
+        with open(out_path, "w", encoding="utf-8-sig", newline="\n") as out:
+            out.write("x,y\n")
+            for start in range(0, rows, chunk):
+                n = min(chunk, rows - start)
+                x = -12 + 24 * (np.arange(start, start + n) / max(1, rows - 1))
+                y = x * x + rng.normal(0, 2, n)
+                lines = np.char.add(np.char.add(np.char.mod("%.6f", x), ","),
+                                    np.char.mod("%.4f", y))
+                out.write("\n".join(lines.tolist()))
+                out.write("\n")
+        finish(path)
+    return out_path
+
+def smiles(n):
+    """n distinct, valid SMILES (no files needed)."""
+    out = []
+    k = 1
+    while len(out) < n:
+        chain = "C" * k
+        for s in (chain, chain + "O", chain + "N", "CC(C)" + chain, chain + "C(=O)O"):
+            out.append(s)
+        k += 1
+    return out[:n]
+
+
+def main():
+    from run import SIZES, prepare  # the sizes live with the benchmark cases
+
+    parser = argparse.ArgumentParser(description="Generate the benchmark inputs.")
+    parser.add_argument("data_dir")
+    parser.add_argument("--size", choices=SIZES, default="small")
+    args = parser.parse_args()
+    for case in SIZES[args.size]:
+        prepare(case, args.size, args.data_dir)
+        print(f"{case}: ready")
+
+if __name__ == "__main__":
+    main()
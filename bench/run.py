@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the tools in this repository.
+
+Each case runs in a fresh Python process on inputs from generators.py and
+reports throughput, latency percentiles of its operations and peak memory
+(max RSS of that process, interpreter and imports included):
+
+    texter         A02 Texter.count() over a large text file          (MB)
+    nist_parser    A03 nist_parser.parse_file() per HTML page         (pages)
+    world_import   A04 WorldDB.import_csv() of the three world CSVs   (rows)
+    world_q2       A04 WorldDB.answer_q2() on the imported tables     (queries)
+    cdxml          A05 convert_file(): parse_cdxml_to_mol + MACCS     (files)
+    graph          A06 graph.py: chunked read, M4 downsampling, plot  (rows)
+    a08_process    A08 POST / through the Flask test client           (requests)
+    a09_process    A09 POST /process through the Flask test client    (requests)
+
+The Flask cases never touch the network or POV-Ray: ChEMBL answers come
+from a local fake client and renders from a stub pipeline, so they measure
+the apps themselves (canonical SMILES, record formatting, RDKit 2D
+depiction, render queueing, JSON/HTML).
+
+Results are written as JSON. With --baseline the run is compared with an
+earlier result file and the exit status is 1 if any case got slower or
+bigger than --tolerance allows.
+
+Usage:
+    python run.py [--size small|large] [--only texter,cdxml] [-o results.json]
+    python run.py --save-baseline baseline-small.json
+    python run.py --baseline baseline-small.json [--tolerance 0.2]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import platform
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.join(HERE, "..")
+DATA_DIR = os.path.join(HERE, "data")
+sys.path.insert(0, HERE)
+import generators
+
+SIZES = {
+    "small": {
+        "texter": {"mb": 50, "repeat": 3},
+        "nist_parser": {"pages": 50, "copies": 10},
+        "world_import": {"scale": 20, "repeat": 3},
+        "world_q2": {"scale": 20, "calls": 500},
+        "cdxml": {"files": 180},
+        "graph": {"rows": 1_000_000, "repeat": 2},
+        "a08_process": {"requests": 200},
+        "a09_process": {"requests": 200},
+    },
+    "large": {
+        "texter": {"mb": 500, "repeat": 3},
+        "nist_parser": {"pages": 200, "copies": 50},
+        "world_import": {"scale": 500, "repeat": 3},
+        "world_q2": {"scale": 500, "calls": 2000},
+        "cdxml": {"files": 5000},
+        "graph": {"rows": 10_000_000, "repeat": 2},
+        "a08_process": {"requests": 2000},
+        "a09_process": {"requests": 2000},
+    },
+}
+
+# metric -> True if higher is better
+METRICS = {"throughput": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+# ---------- inputs ----------
+def prepare(case, size, data_dir):
+    """Generate (or find) the inputs of one case; returns what the case function needs."""
+    p = SIZES[size][case]
+    if case == "texter":
+        return generators.text(data_dir, p["mb"])
+    if case == "nist_parser":
+        return generators.nist(data_dir, p["pages"], p["copies"])
+    if case in ("world_import", "world_q2"):
+        return generators.world(data_dir, p["scale"])
+    if case == "cdxml":
+        return generators.cdxml(data_dir, p["files"])
+    if case == "graph":
+        return generators.graph(data_dir, p["rows"])
+    return generators.smiles(p["requests"] + 10)  # 10 for warm-up
+
+
+# ---------- cases: return {"unit", "items", "latencies" (seconds per operation)} ----------
+def use(assignment):
+    sys.path.insert(0, os.path.join(ROOT, assignment))
+
+def quiet():
+    # The tools print their results; the benchmark only wants the time
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def case_texter(p, path):
+    use("A02")
+    from texter import Texter
+
+    texter = Texter(path)
+    latencies = [timed(texter.count) for _ in range(p["repeat"])]
+    return {"unit": "MB", "items": os.path.getsize(path) / 1e6 * p["repeat"], "latencies": latencies}
+
+def case_nist_parser(p, paths):
+    use("A03")
+    from nist_parser import parse_file
+
+    with quiet():
+        latencies = [timed(parse_file, path) for path in paths]
+    return {"unit": "pages", "items": len(paths), "latencies": latencies}
+
+def count_rows(paths):
+    total = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            total += sum(1 for _ in f) - 1  # minus the header
+    return total
+
+def case_world_import(p, paths):
+    use("A04")
+    from db import WorldDB
+
+    latencies = []
+    for _ in range(p["repeat"]):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = WorldDB(["bench"], db_path=os.path.join(tmp, "world.sqlite"))
+            start = time.perf_counter()
+            with quiet():
+                for path in paths:
+                    db.import_csv(path)
+            latencies.append(time.perf_counter() - start)
+            db.conn.close()
+    return {"unit": "rows", "items": count_rows(paths) * p["repeat"], "latencies": latencies}
+
+def case_world_q2(p, paths):
+    use("A04")
+    from db import WorldDB
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = WorldDB(["bench"], db_path=os.path.join(tmp, "world.sqlite"))
+        with quiet():
+            for path in paths:
+                db.import_csv(path)
+            db.create_indexes()
+            latencies = [timed(db.answer_q2) for _ in range(p["calls"])]
+        db.conn.close()
+    return {"unit": "queries", "items": p["calls"], "latencies": latencies}
+
+def case_cdxml(p, paths):
+    use("A05")
+    from rdkit import RDLogger
+    from cdxml2csv import convert_file
+
+    RDLogger.DisableLog("rdApp.*")  # rx00260 warns about its aluminium valence
+    convert_file(paths[0])  # warm-up: RDKit's lazy initialization
+    latencies = [timed(convert_file, path) for path in paths]
+    return {"unit": "files", "items": len(paths), "latencies": latencies}
+
+def case_graph(p, path):
+    use("A06")
+    import graph
+
+    latencies = []
+    rows = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(p["repeat"]):
+            start = time.perf_counter()
+            reducer = graph.M4Reducer(target=int(6.4 * 300))
+            for x, y in graph.csv_chunks(path, "x", "y"):
+                reducer.add(x, y)
+            x, y = reducer.points()
+            graph.plot(x, y, os.path.join(tmp, "graph.png"), "x", "y", "y vs x", dpi=300)
+            latencies.append(time.perf_counter() - start)
+            rows += reducer.rows
+    return {"unit": "rows", "items": rows, "latencies": latencies}
+
+class FakeChembl:
+    """Offline stand-in for new_client.molecule with ChEMBL-shaped records."""
+
+    def filter(self, molecule_structures__canonical_smiles):
+        smiles = molecule_structures__canonical_smiles
+        return [{
+            "molecule_chembl_id": f"CHEMBL{zlib.crc32(smiles.encode()) % 10 ** 7}",
+            "pref_name": f"BENCH COMPOUND {smiles}",
+            "molecule_type": "Small molecule",
+            "molecule_synonyms": [{"molecule_synonym": f"synonym {i}"} for i in range(5)],
+            "molecule_properties": {
+                "full_molformula": "C2H6O", "full_mwt": "46.07", "alogp": "-0.03",
+                "hba": 1, "hbd": 1, "psa": "20.23", "heavy_atoms": 3, "num_ro5_violations": 0,
+            },
+            "molecule_structures": {
+                "canonical_smiles": smiles,
+                "standard_inchi": "InChI=1S/C2H6O/c1-2-3/h3H,2H2,1H3",
+                "standard_inchi_key": "LFQSCWFLJHTTHZ-UHFFFAOYSA-N",
+            },
+        }]
+
+def offline_lookup():
+    sys.path.insert(0, os.path.join(ROOT, "common"))
+    import chembl_lookup
+
+    # Replaces the instance get_lookup() would build from the environment
+    chembl_lookup._default = chembl_lookup.ChemblLookup(client=FakeChembl(), cache_path=None)
+
+def post_all(client, smiles, request):
+    for s in smiles[:10]:  # warm-up: templates, RDKit, first-request setup
+        request(client, s)
+    latencies = []
+    for s in smiles[10:]:
+        start = time.perf_counter()
+        response = request(client, s)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{s}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+    return {"unit": "requests", "items": len(latencies), "latencies": latencies}
+
+def case_a08_process(p, smiles):
+    offline_lookup()
+    use("A08")
+    import app
+
+    return post_all(app.app.test_client(), smiles,
+                    lambda client, s: client.post("/", data={"smiles": s}))
+
+def case_a09_process(p, smiles):
+    offline_lookup()
+    use("A09")
+    import app
+    import render
+
+    def stub_pipeline(smiles, png_path, settings, workdir):
+        with open(png_path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Renders go to a temporary folder through the stub, never to static/renders
+        app.render_cache = render.RenderCache(folder=tmp, pipeline=stub_pipeline)
+        app.render_queue = render.RenderQueue(app.render_cache)
+        app.preview_queue = render.RenderQueue(app.render_cache, workers=1)
+        app.QUEUES.update(render=app.render_queue, preview=app.preview_queue)
+        result = post_all(app.app.test_client(), smiles,
+                          lambda client, s: client.post("/process", json={"smiles": s}))
+        for queue in (app.render_queue, app.preview_queue):
+            queue.pool.shutdown(wait=True)
+    return result
+
+CASES = {name[len("case_"):]: fn for name, fn in globals().items() if name.startswith("case_")}
+
+
+# ---------- measurement ----------
+def percentile(values, q):
+    # Nearest-rank percentile of sorted values
+    index = max(0, min(len(values) - 1, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+def summarize(raw):
+    latencies = sorted(raw["latencies"])
+    seconds = sum(latencies)
+    return {
+        "unit": raw["unit"],
+        "items": raw["items"],
+        "ops": len(latencies),
+        "seconds": round(seconds, 4),
+        "throughput": round(raw["items"] / seconds, 3) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "peak_rss_mb": raw["peak_rss_mb"],
+    }
+
+def peak_rss_mb():
+    # Linux: VmHWM belongs to this program's address space; ru_maxrss would
+    # also count the peak of the parent process that was forked to start it
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def worker(case, size, data_dir):
+    """Run one case in this process and print its raw result as JSON."""
+    inputs = prepare(case, size, data_dir)
+    raw = CASES[case](SIZES[size][case], inputs)
+    raw["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print(json.dumps(raw))
+
+def run_case(case, size, data_dir):
+    out = subprocess.run([sys.executable, __file__, "--worker", case, "--size", size,
+                          "--data-dir", data_dir],
+                         capture_output=True, text=True, env=dict(os.environ, MPLBACKEND="Agg"))
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed")
+    return summarize(json.loads(out.stdout.strip().splitlines()[-1]))
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# ---------- baseline comparison ----------
+def compare(results, baseline, tolerance):
+    """Print current vs. baseline per case and metric; return the number of regressions."""
+    if baseline.get("size") != results["size"]:
+        print(f"Warning: baseline size is {baseline.get('size')}, this run is {results['size']}")
+    print(f"\n{'case':>14} {'metric':>12} {'baseline':>12} {'current':>12} {'change':>8}")
+    regressions = 0
+    for case, current in results["cases"].items():
+        old = baseline.get("cases", {}).get(case)
+        if not old or "error" in current or "error" in old:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, now = old.get(metric), current.get(metric)
+            if not before or now is None:
+                continue
+            change = (now - before) / before
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            regressions += bool(flag)
+            print(f"{case:>14} {metric:>12} {before:>12.3f} {now:>12.3f} {change:>+7.1%}{flag}")
+    print(f"\n{regressions} regression(s) beyond {tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the ci2 tools.")
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--only", help="comma-separated cases (default: all): " + ", ".join(CASES))
+    parser.add_argument("--data-dir", default=DATA_DIR, help="generated inputs (reused between runs)")
+    parser.add_argument("-o", "--output", help="results JSON (default: results-<size>.json next to run.py)")
+    parser.add_argument("--baseline", help="compare with this results JSON; exit 1 on regressions")
+    parser.add_argument("--save-baseline", metavar="FILE", help="also write the results to FILE")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown or growth (default: 0.2 = 20%%)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.size, args.data_dir)
+        return
+
+    cases = [c.strip() for c in args.only.split(",")] if args.only else list(CASES)
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = dict(environment(), size=args.size, cases={})
+    print(f"{'case':>14} {'throughput':>20} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'peak MB':>8}")
+    for case in cases:
+        start = time.perf_counter()
+        prepare(case, args.size, args.data_dir)  # generated here, so it is not in the case's memory
+        generated = time.perf_counter() - start
+        try:
+            r = run_case(case, args.size, args.data_dir)
+        except (RuntimeError, ValueError) as e:
+            results["cases"][case] = {"error": str(e)}
+            print(f"{case:>14} failed: {e}")
+            continue
+        results["cases"][case] = r
+        note = f"  (inputs generated in {generated:.1f} s)" if generated > 1 else ""
+        print(f"{case:>14} {r['throughput']:>12,.1f} {r['unit'] + '/s':<7} {r['p50_ms']:>9.2f} "
+              f"{r['p90_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['peak_rss_mb']:>8.1f}{note}")
+
+    output = args.output or os.path.join(HERE, f"results-{args.size}.json")
+    for path in filter(None, (output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+    if any("error" in r for r in results["cases"].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
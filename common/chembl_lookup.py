@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Cached ChEMBL molecule lookup shared by the A08 and A09 Flask apps.
+
+A lookup by SMILES goes through three layers:
+    1. an in-process LRU cache with a TTL,
+    2. a persistent SQLite store on disk,
+    3. the ChEMBL web service (new_client.molecule).
+Both caches are keyed by the RDKit canonical SMILES, so equivalent inputs
+(e.g. "OCC" and "CCO") share one entry. Without RDKit the stripped input
+string is used as the key.
+
+In offline mode the lookup answers only from a local SQLite snapshot of
+ChEMBL molecule records and never touches the network. A snapshot has the
+same format as the disk store and is built with the command line below.
+
+The ChEMBL client can be replaced by any object with a
+filter(molecule_structures__canonical_smiles=...) method returning a list
+of molecule dicts, e.g. a SnapshotClient over a local snapshot.
+
+lookup_many() answers a whole list of SMILES: duplicates (after
+canonicalization) are looked up once and the remote lookups run
+concurrently in a thread pool, with results yielded as they arrive.
+
+Environment (used by get_lookup()):
+    CHEMBL_CACHE       disk store (default: common/chembl_cache.sqlite)
+    CHEMBL_OFFLINE     path to a snapshot; enables offline mode
+    CHEMBL_TTL         in-memory TTL in seconds (default: 3600)
+
+Usage:
+    python chembl_lookup.py lookup CCO [--offline snapshot.sqlite]
+    python chembl_lookup.py lookup --file compounds.smi [-j 8]
+    python chembl_lookup.py snapshot OUT.sqlite [--from-cache] [--jsonl records.jsonl]
+    python chembl_lookup.py stats
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+CACHE_PATH = os.path.join(HERE, "chembl_cache.sqlite")
+MEMORY_SIZE = 1024          # molecules kept in the in-process LRU
+MEMORY_TTL = 3600.0         # seconds
+DISK_TTL = 30 * 24 * 3600.0 # seconds; records older than this are fetched again
+MISS_TTL = 300.0            # seconds a "not found" answer is remembered
+BATCH_WORKERS = 8           # concurrent remote lookups in lookup_many()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS molecules (
+    smiles_key TEXT PRIMARY KEY,
+    chembl_id TEXT,
+    record TEXT NOT NULL,
+    fetched REAL NOT NULL);
+"""
+
+def canonical_smiles(smiles):
+    """Return the RDKit canonical SMILES, or the stripped input if it cannot be parsed."""
+    smiles = smiles.strip()
+    try:
+        from rdkit import Chem, RDLogger
+    except ImportError:
+        return smiles
+    RDLogger.DisableLog("rdApp.*")
+    mol = Chem.MolFromSmiles(smiles)
+    return Chem.MolToSmiles(mol) if mol is not None else smiles
+
+
+class LatencyStats:
+    """Call count, total and maximum latency of one lookup source."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_entries=MEMORY_SIZE, ttl=MEMORY_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires, value)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, ttl=None):
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RecordStore:
+    """SQLite store of molecule records keyed by canonical SMILES (disk cache or snapshot)."""
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            uri = "file:" + os.path.abspath(path).replace("\\", "/") + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def get(self, key, max_age=None):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT record, fetched FROM molecules WHERE smiles_key = ?;", (key,)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, record):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO molecules VALUES (?, ?, ?, ?);",
+                              (key, record.get("molecule_chembl_id"),
+                               json.dumps(record), time.time()))
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM molecules;").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class SnapshotClient:
+    """Stand-in for new_client.molecule that answers from a local snapshot."""
+
+    def __init__(self, path):
+        self.store = RecordStore(path, readonly=True)
+
+    def filter(self, molecule_structures__canonical_smiles):
+        record = self.store.get(canonical_smiles(molecule_structures__canonical_smiles))
+        return [record] if record is not None else []
+
+
+class ChemblLookup:
+    """Cached ChEMBL molecule lookup by SMILES."""
+
+    def __init__(self, client=None, cache_path=CACHE_PATH, offline_path=None,
+                 memory_size=MEMORY_SIZE, memory_ttl=MEMORY_TTL, disk_ttl=DISK_TTL):
+        self.offline = offline_path is not None
+        if self.offline:
+            # Offline: the snapshot is both the store and the "remote" source
+            self.store = RecordStore(offline_path, readonly=True)
+            self.disk_ttl = None
+        else:
+            self.store = RecordStore(cache_path) if cache_path else None
+            self.disk_ttl = disk_ttl
+        self.client = client
+        self.memory = TTLCache(memory_size, memory_ttl)
+        self.lock = threading.Lock()
+        self.latency = {s: LatencyStats() for s in ("memory", "disk", "remote", "miss")}
+
+    def get_client(self):
+        if self.client is None:
+            # Imported on first use so offline mode works without the package
+            from chembl_webresource_client.new_client import new_client
+            self.client = new_client.molecule
+        return self.client
+
+    def lookup(self, smiles):
+        """Return the ChEMBL molecule record (dict) for smiles, or None if there is none."""
+        return self.lookup_key(canonical_smiles(smiles), smiles)
+
+    def lookup_key(self, key, smiles):
+        # lookup() with the canonical SMILES already computed
+        start = time.perf_counter()
+        source, record = self.cached(key, smiles)
+
+        if source is None:
+            record = self.fetch(smiles)
+            source = "remote"
+            if record is not None:
+                if self.store is not None and not self.offline:
+                    self.store.put(key, record)
+                with self.lock:
+                    self.memory.put(key, record)
+            else:
+                # Remembered briefly and only for this exact input: ChEMBL
+                # may know an equivalent SMILES written differently
+                with self.lock:
+                    self.memory.put(("miss", smiles.strip()), True, MISS_TTL)
+
+        with self.lock:
+            self.latency[source].add(time.perf_counter() - start)
+        return record
+
+    def lookup_many(self, smiles_list, workers=BATCH_WORKERS):
+        """
+        Look up many SMILES; yield (index, smiles, record, error) as results arrive.
+
+        Inputs with the same canonical SMILES are looked up once. record is
+        None if ChEMBL has no such molecule; error is set if the lookup
+        itself failed (or the input is empty).
+        """
+        groups = OrderedDict()  # canonical SMILES -> [(index, smiles), ...]
+        for index, smiles in enumerate(smiles_list):
+            smiles = (smiles or "").strip()
+            if not smiles:
+                yield index, smiles, None, "Empty SMILES."
+                continue
+            groups.setdefault(canonical_smiles(smiles), []).append((index, smiles))
+        if not groups:
+            return
+
+        # Cache hits come back almost at once, remote lookups as they finish
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(groups))),
+                                  thread_name_prefix="chembl")
+        try:
+            futures = {pool.submit(self.lookup_key, key, items[0][1]): key
+                       for key, items in groups.items()}
+            for future in as_completed(futures):
+                try:
+                    record, error = future.result(), None
+                except Exception as err:
+                    record, error = None, str(err) or type(err).__name__
+                for index, smiles in groups[futures[future]]:
+                    yield index, smiles, record, error
+        finally:
+            # The caller may stop early (e.g. a closed HTTP connection)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def cached(self, key, smiles):
+        # Returns (source, record) or (None, None) if the remote source must be asked
+        with self.lock:
+            record = self.memory.get(key)
+            if record is not None:
+                return "memory", record
+            if self.memory.get(("miss", smiles.strip())):
+                return "miss", None
+        if self.store is not None:
+            record = self.store.get(key, self.disk_ttl)
+            if record is not None:
+                with self.lock:
+                    self.memory.put(key, record)
+                return "disk", record
+        if self.offline:
+            return "miss", None
+        return None, None
+
+    def fetch(self, smiles):
+        res = self.get_client().filter(molecule_structures__canonical_smiles=smiles.strip())
+        if not res:
+            return None
+        return dict(res[0])
+
+    def stats(self):
+        with self.lock:
+            latency = {s: l.as_dict() for s, l in self.latency.items()}
+            memory_entries = len(self.memory)
+        total = sum(l["count"] for l in latency.values())
+        cached = latency["memory"]["count"] + latency["disk"]["count"]
+        return {
+            "offline": self.offline,
+            "lookups": total,
+            "hit_rate": round(cached / total, 4) if total else 0.0,
+            "memory_entries": memory_entries,
+            "disk_entries": len(self.store) if self.store is not None else 0,
+            "latency": latency,
+        }
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_lookup():
+    """Return the process-wide lookup configured from the environment."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ChemblLookup(
+                cache_path=os.environ.get("CHEMBL_CACHE", CACHE_PATH),
+                offline_path=os.environ.get("CHEMBL_OFFLINE") or None,
+                memory_ttl=float(os.environ.get("CHEMBL_TTL", MEMORY_TTL)),
+            )
+        return _default
+
+
+# ---------- command line ----------
+def build_snapshot(out_path, from_cache=None, jsonl=None):
+    """Write molecule records into a snapshot keyed by canonical SMILES."""
+    out = RecordStore(out_path)
+    count = 0
+    if from_cache:
+        src = sqlite3.connect(from_cache)
+        for key, record in src.execute("SELECT smiles_key, record FROM molecules;"):
+            out.put(key, json.loads(record))
+            count += 1
+        src.close()
+    if jsonl:
+        # One ChEMBL molecule record (as returned by the web service) per line
+        with open(jsonl, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                smiles = (record.get("molecule_structures") or {}).get("canonical_smiles")
+                if smiles:
+                    out.put(canonical_smiles(smiles), record)
+                    count += 1
+    out.close()
+    print(f"Wrote {count} records to {out_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached ChEMBL lookup by SMILES.")
+    parser.add_argument("--cache", default=CACHE_PATH, help="disk cache database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    lookup = sub.add_parser("lookup", help="look up SMILES and print the ChEMBL ID")
+    lookup.add_argument("smiles", nargs="*")
+    lookup.add_argument("--file", help="file with one SMILES per line")
+    lookup.add_argument("--offline", metavar="SNAPSHOT", help="answer only from a snapshot")
+    lookup.add_argument("-j", "--workers", type=int, default=BATCH_WORKERS,
+                        help="concurrent remote lookups")
+
+    snapshot = sub.add_parser("snapshot", help="build an offline snapshot")
+    snapshot.add_argument("out")
+    snapshot.add_argument("--from-cache", action="store_true", help="copy the disk cache")
+    snapshot.add_argument("--jsonl", help="file with one ChEMBL molecule record (JSON) per line")
+
+    sub.add_parser("stats", help="print the number of cached molecules")
+    args = parser.parse_args()
+
+    if args.command == "lookup":
+        smiles_list = list(args.smiles)
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as f:
+                smiles_list += [line.split()[0] for line in f if line.strip()]
+        if not smiles_list:
+            print("No SMILES given")
+            sys.exit(1)
+        service = ChemblLookup(cache_path=args.cache, offline_path=args.offline)
+        start = time.perf_counter()
+        for _, smiles, record, error in service.lookup_many(smiles_list, args.workers):
+            found = record.get("molecule_chembl_id") if record else "not found"
+            print(f"{smiles}\t{error or found}")
+        print(f"{len(smiles_list)} SMILES in {time.perf_counter() - start:.2f} s")
+        print(json.dumps(service.stats(), indent=2))
+        service.close()
+    elif args.command == "snapshot":
+        if not args.from_cache and not args.jsonl:
+            print("Nothing to do: use --from-cache and/or --jsonl")
+            sys.exit(1)
+        build_snapshot(args.out, args.cache if args.from_cache else None, args.jsonl)
+    else:
+        store = RecordStore(args.cache)
+        print(f"{args.cache}: {len(store)} molecules")
+        store.close()
+
+if __name__ == "__main__":
+    main()
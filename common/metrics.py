@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Stage timing, latency histograms and error counters for the A08 and A09
+Flask apps, exported in the Prometheus text format.
+
+Code that does one step of a request wraps it in a span:
+
+    with metrics.span("chembl"):
+        data = get_lookup().lookup(smiles)
+
+which observes the duration in the stage_seconds histogram and, if the
+block raises, counts the exception type in stage_errors_total (the
+exception gets a .stage attribute naming the stage where it happened).
+
+init_app(app) adds request counters and latency per endpoint, a /metrics
+route and opt-in profiling: a request with ?profile=1 (or the header
+X-Profile: 1) gets its stage breakdown back in a Server-Timing header,
+e.g. "chembl;dur=812.4, describe;dur=0.1, json;dur=0.3, total;dur=815.2"
+(milliseconds; browsers show it in the network tab).
+
+Values computed at scrape time (queue depth, cache sizes) are added with
+gauge(name, help, fn), or gauge(name, help, fn, label) if fn returns a
+dict of label value -> number.
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds: from cache hits (~1 ms) to publication renders (minutes)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # per bucket, not cumulative
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def label_text(**labels):
+    # Prometheus label values escape backslash, quote and newline
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{k}="{esc(v)}"' for k, v in labels.items())
+
+
+class Metrics:
+    """Thread-safe registry of stage and request metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}    # stage -> Histogram
+        self.errors = {}    # (stage, exception type) -> count
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.latency = {}   # endpoint -> Histogram
+        self.gauges = []    # (name, help, fn, label): fn returns a number or {label value: number}
+        self.local = threading.local()  # .profile: [(stage, seconds)] of the current request
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.stages.setdefault(stage, Histogram()).observe(seconds)
+        profile = getattr(self.local, "profile", None)
+        if profile is not None:
+            profile.append((stage, seconds))
+
+    def error(self, stage, kind):
+        with self.lock:
+            self.errors[stage, kind] = self.errors.get((stage, kind), 0) + 1
+
+    @contextmanager
+    def span(self, stage):
+        """Time the block as stage; count its exceptions by type."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as err:
+            if not hasattr(err, "stage"):  # innermost span names the stage
+                try:
+                    err.stage = stage
+                except AttributeError:
+                    pass
+            self.error(stage, type(err).__name__)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def gauge(self, name, help, fn, label=None):
+        self.gauges.append((name, help, fn, label))
+
+    def request_done(self, endpoint, method, status, seconds):
+        with self.lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(endpoint, Histogram()).observe(seconds)
+
+    # ---------- per-request profiling ----------
+    def start_profile(self):
+        self.local.profile = []
+
+    def stop_profile(self):
+        """Return the stages recorded since start_profile() (None if it was not called)."""
+        profile = getattr(self.local, "profile", None)
+        self.local.profile = None
+        return profile
+
+    # ---------- export ----------
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        out = []
+        with self.lock:
+            out += ["# HELP stage_seconds Time spent in each stage of request handling and rendering.",
+                    "# TYPE stage_seconds histogram"]
+            for stage, hist in sorted(self.stages.items()):
+                out += hist.lines("stage_seconds", label_text(stage=stage))
+            out += ["# HELP stage_errors_total Exceptions raised in each stage, by exception type.",
+                    "# TYPE stage_errors_total counter"]
+            for (stage, kind), n in sorted(self.errors.items()):
+                out.append(f"stage_errors_total{{{label_text(stage=stage, type=kind)}}} {n}")
+            out += ["# HELP http_requests_total Finished requests by endpoint, method and status code.",
+                    "# TYPE http_requests_total counter"]
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                labels = label_text(endpoint=endpoint, method=method, status=status)
+                out.append(f"http_requests_total{{{labels}}} {n}")
+            out += ["# HELP http_request_seconds Request latency by endpoint (until the response is built).",
+                    "# TYPE http_request_seconds histogram"]
+            for endpoint, hist in sorted(self.latency.items()):
+                out += hist.lines("http_request_seconds", label_text(endpoint=endpoint))
+            gauges = list(self.gauges)
+
+        for name, help, fn, label in gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue  # a broken gauge must not break the scrape
+            out += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            if isinstance(value, dict):
+                for key, v in sorted(value.items()):
+                    out.append(f"{name}{{{label_text(**{label: key})}}} {v}")
+            else:
+                out.append(f"{name} {value}")
+        return "\n".join(out) + "\n"
+
+
+registry = Metrics()  # one per process, shared by app.py and render.py
+span = registry.span
+observe = registry.observe
+gauge = registry.gauge
+
+
+def init_app(app, metrics=registry):
+    """Time every request of a Flask app, add /metrics and ?profile=1 support."""
+    from flask import request, g, Response
+
+    def wanted():
+        return request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"
+
+    @app.before_request
+    def start_request():
+        g.metrics_start = time.perf_counter()
+        if wanted():
+            metrics.start_profile()
+
+    @app.after_request
+    def finish_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        seconds = time.perf_counter() - start
+        endpoint = request.endpoint or "unknown"
+        if endpoint != "metrics":
+            metrics.request_done(endpoint, request.method, response.status_code, seconds)
+        profile = metrics.stop_profile()
+        if profile is not None:
+            parts = [f"{stage};dur={s * 1000:.1f}" for stage, s in profile]
+            parts.append(f"total;dur={seconds * 1000:.1f}")
+            response.headers["Server-Timing"] = ", ".join(parts)
+        return response
+
+    @app.teardown_request
+    def drop_profile(exc):
+        metrics.stop_profile()  # never leak a profile into the next request on this thread
+
+    def export():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", export)
+    return app
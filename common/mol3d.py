@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+In-process 3D structures and POV-Ray scenes (replaces obabel --gen3d -O x.pov).
+
+RDKit embeds the molecule (ETKDG) and optimizes it with MMFF (UFF if MMFF has
+no parameters); conformers are cached by canonical SMILES in memory and
+optionally in a SQLite file. write_pov() emits the same declarations as the
+Open Babel POV-Ray writer (mol_0_pos_N, mol_0_atomN with Atom_<element>,
+bond_<order> cylinders for BAS and CST models, mol_0_atoms, mol_0_bonds,
+mol_0, mol_0_center), so the result works with babel_povray3.inc and with
+scenes that include the file and place mol_0 themselves.
+
+Usage (like "obabel etoh.smi -O etoh.pov --gen3D"):
+    python mol3d.py etoh.smi -O etoh.pov [--no-place] [--name mol_0]
+    python mol3d.py -:CCO -O etoh.pov
+"""
+import sys
+import math
+import time
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+
+from rdkit import Chem, RDLogger
+from rdkit.Chem import AllChem
+
+RDLogger.DisableLog("rdApp.*")
+
+RANDOM_SEED = 0xf00d        # same coordinates for the same molecule every time
+CACHE_SIZE = 1024           # conformers kept in memory
+
+# Elements with an Atom_<symbol> object and a Color_<symbol> in babel_povray3.inc
+POV_ELEMENTS = {
+    "C", "H", "D", "O", "N", "F", "Cl", "Br", "I", "P", "S", "B", "Si", "Ge", "Se",
+    "Te", "Li", "Na", "K", "Ca", "Al", "Sn", "Pb", "W", "Pd", "Ni", "Cu", "Mn",
+    "Fe", "V", "Zn",
+}
+
+
+class Conformer:
+    """Element symbols, 3D coordinates and bonds (i, j, order) of one molecule."""
+
+    def __init__(self, smiles, symbols, coords, bonds):
+        self.smiles = smiles
+        self.symbols = symbols
+        self.coords = coords
+        self.bonds = bonds
+
+    def to_block(self):
+        lines = [f"{s} {x!r} {y!r} {z!r}" for s, (x, y, z) in zip(self.symbols, self.coords)]
+        lines += [f"{i} {j} {order}" for i, j, order in self.bonds]
+        return f"{len(self.symbols)}\n" + "\n".join(lines)
+
+    @classmethod
+    def from_block(cls, smiles, block):
+        lines = block.split("\n")
+        n = int(lines[0])
+        atoms = [line.split() for line in lines[1:n + 1]]
+        bonds = [tuple(int(v) for v in line.split()) for line in lines[n + 1:]]
+        return cls(smiles, [a[0] for a in atoms],
+                   [tuple(float(v) for v in a[1:]) for a in atoms], bonds)
+
+
+def embed(smiles):
+    """Embed and optimize smiles; raises ValueError if RDKit cannot."""
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        raise ValueError(f"Invalid SMILES: {smiles}")
+    mol = Chem.AddHs(mol)
+
+    params = AllChem.ETKDGv3()
+    params.randomSeed = RANDOM_SEED
+    if AllChem.EmbedMolecule(mol, params) != 0:
+        params.useRandomCoords = True  # helps large and strained molecules
+        if AllChem.EmbedMolecule(mol, params) != 0:
+            raise ValueError(f"Could not generate 3D coordinates for {smiles}")
+    if AllChem.MMFFHasAllMoleculeParams(mol):
+        AllChem.MMFFOptimizeMolecule(mol, maxIters=500)
+    else:
+        AllChem.UFFOptimizeMolecule(mol, maxIters=500)
+
+    Chem.Kekulize(mol, clearAromaticFlags=True)  # bond orders 1/2 like Open Babel
+    pos = mol.GetConformer().GetPositions()
+    symbols = [a.GetSymbol() for a in mol.GetAtoms()]
+    coords = [tuple(float(v) for v in p) for p in pos]
+    bonds = []
+    for b in mol.GetBonds():
+        order = b.GetBondTypeAsDouble()
+        bonds.append((b.GetBeginAtomIdx(), b.GetEndAtomIdx(),
+                      int(order) if order in (1.0, 2.0, 3.0) else 0))
+    return Conformer(smiles, symbols, coords, bonds)
+
+
+class ConformerCache:
+    """Conformers by canonical SMILES: LRU in memory, optionally a SQLite file on disk."""
+
+    def __init__(self, path=None, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.key_locks = {}  # key -> lock held while the key is being embedded
+        self.hits = self.misses = 0
+        self.embed_seconds = 0.0
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS conformers "
+                              "(smiles TEXT PRIMARY KEY, block TEXT NOT NULL);")
+
+    def get(self, smiles):
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            raise ValueError(f"Invalid SMILES: {smiles}")
+        key = Chem.MolToSmiles(mol)
+
+        with self.lock:
+            conf = self.lookup(key)
+            if conf is not None:
+                return conf
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        # One embedding per key; concurrent callers wait and then hit the cache
+        with key_lock:
+            with self.lock:
+                conf = self.lookup(key)
+                if conf is not None:
+                    return conf
+                self.misses += 1
+            start = time.perf_counter()
+            try:
+                conf = embed(key)
+                with self.lock:
+                    self.embed_seconds += time.perf_counter() - start
+                    self.remember(key, conf)
+                    if self.conn is not None:
+                        with self.conn:
+                            self.conn.execute("INSERT OR REPLACE INTO conformers VALUES (?, ?);",
+                                              (key, conf.to_block()))
+            finally:
+                with self.lock:
+                    self.key_locks.pop(key, None)
+        return conf
+
+    def lookup(self, key):
+        # Called with self.lock held
+        conf = self.entries.get(key)
+        if conf is None and self.conn is not None:
+            row = self.conn.execute("SELECT block FROM conformers WHERE smiles = ?;",
+                                    (key,)).fetchone()
+            if row:
+                conf = Conformer.from_block(key, row[0])
+        if conf is not None:
+            self.hits += 1
+            self.remember(key, conf)
+        return conf
+
+    def remember(self, key, conf):
+        self.entries[key] = conf
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "mean_embed_s": round(self.embed_seconds / self.misses, 4) if self.misses else 0.0,
+            }
+
+
+cache = ConformerCache()
+
+def conformer(smiles):
+    """Cached conformer of smiles (process-wide in-memory cache)."""
+    return cache.get(smiles)
+
+
+# ---------- POV-Ray writer ----------
+def fmt(v):
+    return f"{v:g}"
+
+def vec(v):
+    return "<" + ",".join(fmt(c) for c in v) + ">"
+
+def atom_object(symbol):
+    if symbol in POV_ELEMENTS:
+        return f"Atom_{symbol}"
+    return "atom pigment {color Color_Metal}"  # no Atom_<symbol> in the include file
+
+def atom_color(symbol):
+    return f"Color_{symbol}" if symbol in POV_ELEMENTS else "Color_Metal"
+
+def bond_angles(p1, p2):
+    """Length and the z/y rotations (degrees) that turn the unit x cylinder from p1 to p2."""
+    dx, dy, dz = p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]
+    length = math.sqrt(dx * dx + dy * dy + dz * dz)
+    phi = math.degrees(math.asin(max(-1.0, min(1.0, dy / length)))) if length else 0.0
+    flat = math.sqrt(dx * dx + dz * dz)
+    theta = math.degrees(math.acos(max(-1.0, min(1.0, dx / flat)))) if flat else 0.0
+    if dz > 0:
+        theta = -theta
+    return length, phi, theta
+
+def write_pov(conf, out, name="mol_0", scene=True, place=True, include=True):
+    """
+    Write conf as POV-Ray code to the text stream out.
+
+    scene adds the header, light, camera and background of Open Babel's
+    output; place ends the file with the object itself (leave it out when
+    another scene includes the file and places name itself); include adds
+    the #include of babel_povray3.inc (a scene with several molecules needs
+    it only once).
+    """
+    n = len(conf.symbols)
+    xs, ys, zs = zip(*conf.coords)
+    centroid = (sum(xs) / n, sum(ys) / n, sum(zs) / n)
+    w = out.write
+
+    if scene:
+        extent = max(max(xs) - min(xs), max(ys) - min(ys), max(zs) - min(zs))
+        distance = max(10.0, 2.0 * extent)  # Open Babel uses 10; keep big molecules in view
+        w("//Povray v3 code generated by mol3d.py (RDKit)\n\n")
+        w("//Set some global parameters for display options\n")
+        w("#declare BAS = true;\n#declare TRANS = false;\n\n")
+        w('#include "colors.inc"\n\n')
+        w("// create a regular point light source\nlight_source {\n")
+        w(f"  {vec((centroid[0] + 2, centroid[1] + 3, centroid[2] - distance + 2))}\n")
+        w("  color rgb <1,1,1>    // light's color\n}\n\n")
+        w("// set a color of the background (sky)\nbackground { color rgb <0.95 0.95 0.95> }\n\n")
+        w("// perspective (default) camera\ncamera {\n")
+        w(f"  location  {vec((centroid[0], centroid[1], centroid[2] - distance))}\n")
+        w(f"  look_at   {vec(centroid)}\n")
+        w("  right     x*image_width/image_height\n}\n\n")
+    if include:
+        w('//Include header for povray\n#include "babel_povray3.inc"\n\n')
+    if scene:
+        w("//Use PovRay3.6\n#version 3.6;\n\n")
+
+    w(f"//Coodinates of atoms 1 - {n}\n")
+    for i, p in enumerate(conf.coords, start=1):
+        w(f"#declare {name}_pos_{i} = {vec(p)};\n")
+
+    w(f"\n//Povray-description of atoms 1 - {n}\n")
+    for i, symbol in enumerate(conf.symbols, start=1):
+        w(f"#declare {name}_atom{i} = object {{\n\t  {atom_object(symbol)}\n"
+          f"\t  translate {name}_pos_{i}\n\t }}\n")
+
+    if conf.bonds:
+        w(f"\n//Povray-description of bonds 1 - {len(conf.bonds)}\n#if (BAS)\n")
+        for k, (i, j, order) in enumerate(conf.bonds):
+            length, phi, theta = bond_angles(conf.coords[i], conf.coords[j])
+            w(f"#declare {name}_bond{k} = object {{\n\t  bond_{order}\n"
+              f"\t  scale <{length:.4g},1.0000,1.0000>\n"
+              f"\t  rotate <0.0000,0.0000,{fmt(phi)}>\n"
+              f"\t  rotate <0.0000,{fmt(theta)},0.0000>\n"
+              f"\t  translate {name}_pos_{i + 1}\n\t }}\n")
+        w("#end //(BAS-Bonds)\n\n#if (CST)\n")
+        for k, (i, j, order) in enumerate(conf.bonds):
+            length, phi, theta = bond_angles(conf.coords[i], conf.coords[j])
+            halves = []
+            for atom, color, angle in ((i, atom_color(conf.symbols[i]), phi),
+                                       (j, atom_color(conf.symbols[j]), phi + 180)):
+                halves.append(f"\t   object {{\n\t    bond_{order}\n"
+                              f"\t    pigment{{color {color}}}\n"
+                              f"\t    scale <{length / 2:.4g},1.0000,1.0000>\n"
+                              f"\t    rotate <0.0000,0.0000,{fmt(angle)}>\n"
+                              f"\t    rotate <0.0000,{fmt(theta)},0.0000>\n"
+                              f"\t    translate {name}_pos_{atom + 1}\n\t   }}\n")
+            w(f"#declare {name}_bond{k} = object {{\n\t  union {{\n"
+              + "".join(halves) + "\t  }\n\t }\n\n")
+        w("#end // (CST-Bonds)\n\n")
+
+    w(f"\n//All atoms of molecule {name}\n#ifdef (TRANS)\n#declare {name}_atoms = merge {{\n"
+      f"#else\n#declare {name}_atoms = union {{\n#end //(End of TRANS)\n")
+    for i in range(1, n + 1):
+        w(f"\t  object{{{name}_atom{i}}}\n")
+    w("\t }\n\n")
+
+    if conf.bonds:
+        w(f"//Bonds only needed for ball and sticks or capped sticks models\n"
+          f"#if (BAS | CST)\n#declare {name}_bonds = union {{\n")
+        for k in range(len(conf.bonds)):
+            w(f"\t  object{{{name}_bond{k}}}\n")
+        w("\t }\n#end\n\n")
+
+    w(f"\n//Definition of molecule {name}\n#if (SPF)\n#declare {name} = object{{\n"
+      f"\t  {name}_atoms\n#else\n#declare {name} = union {{\n\t  object{{{name}_atoms}}\n")
+    if conf.bonds:
+        w(f"#if (BAS | CST)//(Not really needed at moment!)\n#if (TRANS)\n"
+          f"\t  difference {{\n\t   object{{{name}_bonds}}\n\t   object{{{name}_atoms}}\n\t  }}\n"
+          f"#else\n\t  object{{{name}_bonds}}\n#end //(End of TRANS)\n#end //(End of (BAS|CST))\n")
+    w("#end //(End of SPF)\n\t }\n\n")
+
+    mid = [(min(c) + max(c)) / 2 for c in (xs, ys, zs)]
+    w(f"//Center of molecule {name} (bounding box)\n"
+      f"#declare {name}_center = {vec([-m for m in mid])};\n\n")
+    if place:
+        w(f"{name}\n")
+
+def write_pov_file(smiles, path, **kwargs):
+    """Embed smiles (cached) and write it to path; returns the conformer."""
+    conf = conformer(smiles)
+    with open(path, "w", encoding="utf-8") as f:
+        write_pov(conf, f, **kwargs)
+    return conf
+
+
+def read_smiles(source):
+    # "-:SMILES" as in obabel, otherwise a .smi file (first column of each line)
+    if source.startswith("-:"):
+        return [source[2:]]
+    with open(source, "r", encoding="utf-8") as f:
+        return [line.split()[0] for line in f if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="SMILES -> 3D POV-Ray file (RDKit, no obabel).")
+    parser.add_argument("source", help=".smi file or -:SMILES")
+    parser.add_argument("-O", "--output", required=True, help="output .pov file")
+    parser.add_argument("--name", default="mol_0", help="POV-Ray name of the molecule")
+    parser.add_argument("--no-place", action="store_true",
+                        help="omit the final object line (for files included by another scene)")
+    parser.add_argument("--gen3d", "--gen3D", action="store_true", help="accepted for obabel compatibility")
+    argv = sys.argv[1:]
+    inline = [a for a in argv if a.startswith("-:")]  # -:SMILES is not an option
+    rest = [a for a in argv if a not in inline]
+    args = parser.parse_args(rest + ["--"] + inline if inline else rest)
+
+    smiles = read_smiles(args.source)
+    if not smiles:
+        print(f"No SMILES in {args.source}")
+        sys.exit(1)
+    if len(smiles) > 1:
+        print(f"{args.source} has {len(smiles)} molecules; writing the first one")
+    start = time.perf_counter()
+    conf = write_pov_file(smiles[0], args.output, name=args.name, place=not args.no_place)
+    print(f"{len(conf.symbols)} atoms written to {args.output} "
+          f"in {time.perf_counter() - start:.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Tests for chembl_lookup.py against a local stand-in for the ChEMBL client.
+
+Run from the repository root (no network needed):
+    python -m pytest -q common
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import chembl_lookup
+from chembl_lookup import ChemblLookup, RecordStore, canonical_smiles
+
+
+ETHANOL = {
+    "molecule_chembl_id": "CHEMBL545",
+    "pref_name": "ETHANOL",
+    "molecule_structures": {"canonical_smiles": "CCO"},
+}
+
+
+class FakeClient:
+    """Answers filter() from a dict keyed by canonical SMILES and records every call."""
+
+    def __init__(self, records=None):
+        self.records = {canonical_smiles(s): r for s, r in (records or {}).items()}
+        self.calls = []
+
+    def filter(self, molecule_structures__canonical_smiles):
+        self.calls.append(molecule_structures__canonical_smiles)
+        record = self.records.get(canonical_smiles(molecule_structures__canonical_smiles))
+        return [record] if record is not None else []
+
+
+class FakeClock:
+    """Replaces the time module in chembl_lookup, so TTLs can expire without sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return time.time() + self.now
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+
+def counts(service):
+    return {s: l["count"] for s, l in service.stats()["latency"].items()}
+
+def test_memory_hit(tmp_path):
+    client = FakeClient({"CCO": ETHANOL})
+    service = ChemblLookup(client=client, cache_path=str(tmp_path / "cache.sqlite"))
+    assert service.lookup("CCO") == ETHANOL
+    assert service.lookup("CCO") == ETHANOL
+    assert len(client.calls) == 1
+    assert counts(service) == {"memory": 1, "disk": 0, "remote": 1, "miss": 0}
+    service.close()
+
+def test_disk_hit_after_restart(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    first = ChemblLookup(client=FakeClient({"CCO": ETHANOL}), cache_path=cache_path)
+    first.lookup("CCO")
+    first.close()
+
+    client = FakeClient()  # knows nothing: the answer must come from the disk store
+    second = ChemblLookup(client=client, cache_path=cache_path)
+    assert second.lookup("CCO") == ETHANOL
+    assert client.calls == []
+    assert counts(second)["disk"] == 1
+    # The disk hit is now in memory, too
+    assert second.lookup("CCO") == ETHANOL
+    assert counts(second) == {"memory": 1, "disk": 1, "remote": 0, "miss": 0}
+    second.close()
+
+def test_offline_snapshot_hit(tmp_path):
+    snapshot = str(tmp_path / "snapshot.sqlite")
+    store = RecordStore(snapshot)
+    store.put(canonical_smiles("CCO"), ETHANOL)
+    store.close()
+
+    client = FakeClient({"c1ccccc1": {"molecule_chembl_id": "CHEMBL277500"}})
+    service = ChemblLookup(client=client, offline_path=snapshot)
+    assert service.lookup("OCC") == ETHANOL
+    assert service.lookup("c1ccccc1") is None  # not in the snapshot: never asks the client
+    assert client.calls == []
+    assert counts(service) == {"memory": 0, "disk": 1, "remote": 0, "miss": 1}
+    service.close()
+
+def test_equivalent_smiles_share_one_key(tmp_path):
+    assert canonical_smiles("OCC") == canonical_smiles("CCO") == canonical_smiles(" C(O)C ")
+    client = FakeClient({"CCO": ETHANOL})
+    service = ChemblLookup(client=client, cache_path=str(tmp_path / "cache.sqlite"))
+    assert service.lookup("OCC") == ETHANOL
+    assert service.lookup("CCO") == ETHANOL
+    assert service.lookup("C(O)C") == ETHANOL
+    assert client.calls == ["OCC"]
+    assert len(service.store) == 1
+    service.close()
+
+def test_miss_expires_after_ttl(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(chembl_lookup, "time", clock)
+    client = FakeClient()
+    service = ChemblLookup(client=client, cache_path=str(tmp_path / "cache.sqlite"))
+
+    assert service.lookup("CCO") is None
+    assert service.lookup("CCO") is None  # remembered miss
+    assert len(client.calls) == 1
+
+    clock.now += chembl_lookup.MISS_TTL + 1
+    client.records[canonical_smiles("CCO")] = ETHANOL  # ChEMBL has it by now
+    assert service.lookup("CCO") == ETHANOL
+    assert len(client.calls) == 2
+    assert counts(service) == {"memory": 0, "disk": 0, "remote": 2, "miss": 1}
+    service.close()
+
+def test_counters(tmp_path):
+    client = FakeClient({"CCO": ETHANOL})
+    service = ChemblLookup(client=client, cache_path=str(tmp_path / "cache.sqlite"))
+    for smiles in ("CCO", "OCC", "CCO", "CCCC", "CCCC"):
+        service.lookup(smiles)
+
+    stats = service.stats()
+    assert stats["lookups"] == 5
+    # remote: CCO, CCCC; memory: OCC, CCO; miss: the second CCCC
+    assert counts(service) == {"memory": 2, "disk": 0, "remote": 2, "miss": 1}
+    assert stats["hit_rate"] == pytest.approx(2 / 5)
+    assert stats["memory_entries"] == 2  # the record and the remembered miss
+    assert stats["disk_entries"] == 1
+    for source in stats["latency"].values():
+        assert source["max_ms"] >= 0.0
+        assert source["mean_ms"] <= source["max_ms"]
+    service.close()